@@ -50,6 +50,7 @@ class PathConfig(ConfigBase):
 
 class TrainerConfig(ConfigBase):
     num_epochs = num_epochs
+    memory_format = 'channels_last'
     
     log_interval = gradient_accumulation_interval
     
@@ -62,6 +63,10 @@ class TrainerConfig(ConfigBase):
     ckpt_folder_path = PathConfig().checkpoints
     ckpt_interval = gradient_accumulation_interval * ckpt_interval
     ckpt_seed = 42
+    ckpt_keep_last = 3
+    ckpt_keep_every = gradient_accumulation_interval * ckpt_interval * 50
+    
+    ema_decay = 0.9999
     
     lr_scheduler_mode = 'per_step'
 
@@ -16,6 +16,7 @@ from hurricore.hooks import (
     LRSchedulerHook,
     TensorBoardHook,
     CheckpointHook,
+    EMAHook,
 )
 
 from img_peek_hook import ImgPeekHook
@@ -48,7 +49,14 @@ class DiffusionTrainer(Trainer):
             ckpt_folder_path: Path = None,
             ckpt_interval: int = 1000,
             ckpt_seed: int = 42,
+            ckpt_keep_last: int = None,
+            ckpt_keep_every: int = None,
             
+            ema_decay: float = None,
+            ema_interval: int = 1,
+            ema_offload_to_cpu: bool = False,
+            
+            **kwargs,
         ):
         super().__init__(
             models=[model],
@@ -56,6 +64,7 @@ class DiffusionTrainer(Trainer):
             data_loaders=[data_loader],
             accelerator=accelerator,
             num_epochs=num_epochs,
+            **kwargs,
         )
         
         noise_scheduler = noise_scheduler.to(self.accelerator.device)
@@ -86,15 +95,50 @@ class DiffusionTrainer(Trainer):
                 folder_path=ckpt_folder_path,
                 interval=ckpt_interval,
                 seed=ckpt_seed,
+                keep_last=ckpt_keep_last,
+                keep_every=ckpt_keep_every,
             ),
         ]
+        if ema_decay is not None:
+            self.hooks.append(
+                EMAHook(
+                    trainer=self,
+                    decay=ema_decay,
+                    interval=ema_interval,
+                    offload_to_cpu=ema_offload_to_cpu,
+                )
+            )
         
         
+    def training_step(self) -> Tensor:
+        '''
+        Timesteps and noise are drawn once per step and carried with the images, so that selective backprop
+        trains on the same losses it selected samples by, and splitting batches splits them along.
+        '''
+        batches = self.ctx.batches
+        images = batches[0]
+        t = torch.randint(0, self.noise_scheduler.num_steps, (images.shape[0],)).to(images.device)
+        noise = torch.randn_like(images)
+        self.ctx.batches = ((images, t, noise), )
+        loss = super().training_step()
+        self.ctx.batches = batches
+        return loss
+    
+    
     def compute_loss(self) -> Tensor:
+        return self.compute_per_sample_loss().mean()
+    
+    
+    def compute_per_sample_loss(self) -> Tensor:
         model = self.models[0]
         batch = self.ctx.batches[0]
-        t = torch.randint(0, self.noise_scheduler.num_steps, (batch.shape[0],)).to(batch.device)
-        corrupted_images, noise = self.noise_scheduler.corrupt(batch, t)
+        # timesteps and noise are drawn here if they are not drawn by the training step
+        if isinstance(batch, Tensor):
+            t = torch.randint(0, self.noise_scheduler.num_steps, (batch.shape[0],)).to(batch.device)
+            noise = None
+        else:
+            batch, t, noise = batch
+        corrupted_images, noise = self.noise_scheduler.corrupt(batch, t, noise)
         predicted_noise = model(corrupted_images, t)
-        loss = torch.nn.functional.mse_loss(predicted_noise, noise)
-        return loss
+        loss = torch.nn.functional.mse_loss(predicted_noise.float(), noise.float(), reduction='none')
+        return loss.flatten(1).mean(1)
@@ -1,9 +1,10 @@
+from contextlib import nullcontext
 from pathlib import Path
 
 import torch
 from torchvision.utils import save_image, make_grid
 
-from hurricore.hooks import Hook, LoggerHook, TensorBoardHook
+from hurricore.hooks import Hook, LoggerHook, TensorBoardHook, EMAHook
 from hurricore.trainers import Trainer
 
 
@@ -13,6 +14,7 @@ class ImgPeekHook(Hook):
         trainer: Trainer,
         folder_path: Path,
         interval: int,
+        seed: int = 42,
     ):
         super().__init__(trainer)
         assert interval > 0, 'Image peek interval must be greater than 0.'
@@ -22,17 +24,19 @@ class ImgPeekHook(Hook):
         self.peek_interval = interval
         image_size = trainer.originals.models[0].image_size
         self.num_steps = trainer.noise_scheduler.num_steps
-        z = torch.randn(9, 3, image_size, image_size, device=trainer.accelerator.device)
-        trainer.ctx.z = z
-
-    def recover_from_checkpoint(self):
-        self.trainer.ctx.z = self.trainer.ctx.z.to(self.trainer.accelerator.device)
+        # seeded instead of checkpointed, so that resumed runs peek with the same noise
+        generator = torch.Generator().manual_seed(seed)
+        z = torch.randn(9, 3, image_size, image_size, generator=generator)
+        trainer.ctx.z = z.to(trainer.accelerator.device)
     
     def on_step_end(self):
         if (self.trainer.ctx.global_step + 1) % self.peek_interval == 0:
-            model = self.trainer.models[0]
+            model = self.trainer.originals.models[0]
             model.eval()
-            with torch.no_grad():
+            # sample with averaged weights if available
+            ema_hook = self.trainer.get_hook(EMAHook)
+            ema_context = nullcontext() if ema_hook is None else ema_hook.swap_weights()
+            with ema_context, torch.no_grad():
                 images = self.trainer.ctx.z.to(self.trainer.accelerator.device)
                 for t in reversed(range(self.num_steps)):
                     t = torch.full((images.size(0), ), t, device=images.device, dtype=torch.long)
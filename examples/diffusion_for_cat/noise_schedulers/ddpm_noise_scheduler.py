@@ -40,11 +40,13 @@ class DDPMNoiseScheduler:
             self, 
             images: torch.Tensor, 
             t: torch.Tensor,
+            noise: torch.Tensor = None,
         ) -> tuple[torch.Tensor, torch.Tensor]:
         t = t.reshape(-1, 1, 1, 1)
         mean = self.gather('sqrt(alphas_bar)', t) * images
         std = self.gather('sqrt(1 - alphas_bar)', t)
-        noise = torch.randn_like(images, device=images.device)
+        if noise is None:
+            noise = torch.randn_like(images, device=images.device)
         corrupted_images = mean + std * noise
         return corrupted_images, noise
     
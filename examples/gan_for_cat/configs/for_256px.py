@@ -65,6 +65,9 @@ class DataLoaderConfig(ConfigBase):
 
 class TrainerConfig(ConfigBase):
     num_epochs = num_epochs
+    memory_format = 'channels_last'
+    activation_checkpointing = False
+    activation_checkpointing_policy = ['_ResBlock']
     gp_lambda = 10
     d_loop_per_step = 1
     g_loop_per_step = 1
@@ -35,7 +35,7 @@ def _compute_gradient_penalty(
         only_inputs=True
     )[0]
 
-    gradients = gradients.view(gradients.size()[0], -1)
+    gradients = gradients.reshape(gradients.size(0), -1)
     gradient_penalty = ((gradients.norm(2, dim=1) - 1) ** 2).mean()
     return gradient_penalty
 
@@ -75,6 +75,8 @@ class GANTrainer(Trainer):
         checkpoint_folder_path: str = None,
         checkpoint_interval: int = 1000,
         checkpoint_seed: int = 42,
+        
+        **kwargs,
     ) -> None:
         
         super().__init__(
@@ -83,6 +85,7 @@ class GANTrainer(Trainer):
             optimizers=[g_optimizer, d_optimizer], 
             accelerator=accelerator,
             num_epochs=num_epochs,
+            **kwargs,
         )
         
         self.gp_lambda = gp_lambda
@@ -164,8 +167,10 @@ class GANTrainer(Trainer):
                     g_loss = -avg_fake_score
                 self.accelerator.backward(g_loss)
                 g_optimizer.step()
-            # save losses to context
+            # save losses to context and metrics registry
             self.ctx.g_step_loss = g_loss
             self.ctx.d_step_loss = d_loss
+            self.metrics.push('g_loss', g_loss)
+            self.metrics.push('d_loss', d_loss)
             # return dummy loss
             return torch.tensor([.0], device=self.accelerator.device)
@@ -1,47 +1,33 @@
-from torch.cuda import memory_reserved
-
 from hurricore.hooks.logger_hook import LoggerHook
-from hurricore.utils import get_list_mean
 
 
 class GANLoggerHook(LoggerHook):
     
-    def on_epoch_start(self) -> None:
-        super().on_epoch_start()
-        self.g_step_losses = []
-        self.d_step_losses = []
-    
-    
-    def _collect_step_loss(self):
-        g_step_loss = self.trainer.accelerator.gather(self.trainer.ctx.g_step_loss).detach().mean().item()
-        d_step_loss = self.trainer.accelerator.gather(self.trainer.ctx.d_step_loss).detach().mean().item()
-        self.g_step_losses.append(g_step_loss)
-        self.d_step_losses.append(d_step_loss)
-    
-    
     def _log_states(self):
+        if len(self.interval_metrics) == 0:
+            return
         idx = self.trainer.ctx.batches_idx + 1
         num_steps_per_epoch = self.trainer.ctx.num_steps_per_epoch
         epoch = self.trainer.ctx.epoch + 1
         progress = idx / num_steps_per_epoch
         remaining_time = self._get_remaining_time()
+        resources = self._format_resources()
         
-        self.logger.info(
-            f"Epoch: {epoch}/{self.trainer.ctx.num_epochs} | "
-            f"Step: {idx}/{num_steps_per_epoch} | "
-            f"G loss: {self.trainer.ctx.g_step_loss:.5f} | "
-            f"D loss: {self.trainer.ctx.d_step_loss:.5f} |"
-            f"Progress: {progress:.2%} | "
-            f"Time left: {remaining_time} | "
-            f"Memory used: {memory_reserved() / 1024 ** 3:.2f}GB"
-        )
+        states = [
+            f"Epoch: {epoch}/{self.trainer.ctx.num_epochs}",
+            f"Step: {idx}/{num_steps_per_epoch}",
+            f"G loss: {self.interval_metrics['g_loss']:.5f}",
+            f"D loss: {self.interval_metrics['d_loss']:.5f}",
+            f"Progress: {progress:.2%}",
+            f"Time left: {remaining_time}",
+        ]
+        if resources:
+            states.append(resources)
+        self.logger.info(' | '.join(states))
 
 
     def on_epoch_end(self) -> None:
-        avg_g_loss = get_list_mean(self.g_step_losses)
-        avg_d_loss = get_list_mean(self.d_step_losses)
+        epoch_losses = self.trainer.metrics.read_epoch()
         self.logger.info(f'Epoch {self.trainer.ctx.epoch + 1} finished')
-        self.logger.info(f'Average G loss: {avg_g_loss:.5f}')
-        self.logger.info(f'Average D loss: {avg_d_loss:.5f}')
-
-    
\ No newline at end of file
+        self.logger.info(f"Average G loss: {epoch_losses.get('g_loss', 0.0):.5f}")
+        self.logger.info(f"Average D loss: {epoch_losses.get('d_loss', 0.0):.5f}")
@@ -13,6 +13,7 @@ class ImgPeekHook(Hook):
         trainer: Trainer,
         folder_path: Path,
         interval: int,
+        seed: int = 42,
     ):
         super().__init__(trainer)
         assert interval > 0, 'Image peek interval must be greater than 0.'
@@ -20,13 +21,15 @@ class ImgPeekHook(Hook):
         assert hasattr(trainer, 'accelerator'), 'Trainer must have an accelerator.'
         self.folder_path = folder_path
         self.peek_interval = interval
-        z = torch.randn(9, trainer.originals.models[0].z_dim)
+        # seeded instead of checkpointed, so that resumed runs peek with the same noise
+        generator = torch.Generator().manual_seed(seed)
+        z = torch.randn(9, trainer.originals.models[0].z_dim, generator=generator)
         trainer.ctx.z = z
 
     
     def on_step_end(self):
         if (self.trainer.ctx.global_step + 1) % self.peek_interval == 0:
-            g_model = self.trainer.models[0]
+            g_model = self.trainer.originals.models[0]
             g_model.eval()
             with torch.no_grad():
                 images = g_model(self.trainer.ctx.z.to(self.trainer.accelerator.device)).detach()
@@ -45,6 +45,7 @@ class PathConfig(ConfigBase):
 
 class FlowTrainerConfig(ConfigBase):
     num_epochs = num_epochs
+    memory_format = 'channels_last'
     
     img_peek_folder_path = PathConfig().img_peek
     img_peek_interval = gradient_accumulation_interval * img_peek_interval
@@ -60,6 +61,8 @@ class FlowTrainerConfig(ConfigBase):
     ckpt_interval = gradient_accumulation_interval * ckpt_interval
     ckpt_seed = 42
     
+    ema_decay = 0.9999
+    
 
 class OptimizerConfig(ConfigBase):
     lr = lr
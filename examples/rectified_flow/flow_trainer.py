@@ -17,6 +17,7 @@ from hurricore.hooks import (
     LRSchedulerHook, 
     TensorBoardHook, 
     CheckpointHook,
+    EMAHook,
 )
 
 from img_peek_hook import ImgPeekHook
@@ -47,6 +48,12 @@ class FlowTrainer(Trainer):
         ckpt_folder_path: Path = None,
         ckpt_interval: int = 100,
         ckpt_seed: int = 42,
+        
+        ema_decay: float = None,
+        ema_interval: int = 1,
+        ema_offload_to_cpu: bool = False,
+        
+        **kwargs,
     ) -> None:
         super().__init__(
             models=[model], 
@@ -54,6 +61,7 @@ class FlowTrainer(Trainer):
             optimizers=[optimizer], 
             accelerator=accelerator,
             num_epochs=num_epochs,
+            **kwargs,
         )
         self.hooks = [
             ImgPeekHook(
@@ -84,6 +92,15 @@ class FlowTrainer(Trainer):
                 seed=ckpt_seed,
             ),
         ]
+        if ema_decay is not None:
+            self.hooks.append(
+                EMAHook(
+                    trainer=self,
+                    decay=ema_decay,
+                    interval=ema_interval,
+                    offload_to_cpu=ema_offload_to_cpu,
+                )
+            )
         
     def compute_loss(self) -> Tensor:
         
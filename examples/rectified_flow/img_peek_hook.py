@@ -1,10 +1,11 @@
+from contextlib import nullcontext
 from pathlib import Path
 
 import torch
 from torch.utils.data import Dataset
 from torchvision.utils import save_image, make_grid
 
-from hurricore.hooks import Hook, LoggerHook, TensorBoardHook
+from hurricore.hooks import Hook, LoggerHook, TensorBoardHook, EMAHook
 from hurricore.trainers import Trainer
 
 from navigator import Navigator
@@ -29,9 +30,12 @@ class ImgPeekHook(Hook):
     
     def on_step_end(self):
         if (self.trainer.ctx.global_step + 1) % self.peek_interval == 0:
-            model = self.trainer.models[0]
+            model = self.trainer.originals.models[0]
             model.eval()
-            with torch.no_grad():
+            # sample with averaged weights if available
+            ema_hook = self.trainer.get_hook(EMAHook)
+            ema_context = nullcontext() if ema_hook is None else ema_hook.swap_weights()
+            with ema_context, torch.no_grad():
                 src_images = self.trainer.ctx.src_images.to(self.trainer.accelerator.device)
                 navigator = Navigator(model, num_steps=100)
                 tgt_images = navigator.navigate(src_images)
@@ -14,6 +14,7 @@ config_name = get_file_name()
 class LaunchConfig(ConfigBase):
     num_processes = 1
     use_port = "8009"
+    cpu_bf16 = True
 
 
 class PathConfig(ConfigBase):
@@ -31,6 +32,8 @@ class PathConfig(ConfigBase):
 
 class TrainerConfig(ConfigBase):
     num_epochs = num_epochs
+    memory_format = 'channels_last'
+    pin_cpu_threads = True
     
     log_interval = gradient_accumulation_interval
     
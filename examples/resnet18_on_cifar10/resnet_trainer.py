@@ -41,6 +41,7 @@ class ResNetTrainer(Trainer):
         ckpt_folder_path: Path = None,
         ckpt_interval: int = 100,
         
+        **kwargs,
     ) -> None:
         super().__init__(
             models=[model], 
@@ -48,6 +49,7 @@ class ResNetTrainer(Trainer):
             optimizers=[optimizer], 
             accelerator=accelerator,
             num_epochs=num_epochs,
+            **kwargs,
         )
         self.hooks = [
             LoggerHook(
@@ -32,21 +32,24 @@ class PathConfig(ConfigBase):
 
 class TrainerConfig(ConfigBase):
     num_epochs = num_epochs
+    interval_unit = 'sync_step'
+    skip_prompt_logits = True
+    max_grad_norm = 1.0
     
-    log_interval = gradient_accumulation_interval
+    log_interval = 1
     
     peek_prompts = [
         '如何看待明天下雨？',
         '为什么太阳比地球大？',
         '你如何看待近期的股市？',
     ]
-    peek_interval=gradient_accumulation_interval * 10
+    peek_interval = 10
 
     tensor_board_folder_path = PathConfig().tensor_boards
-    tensor_board_interval = gradient_accumulation_interval
+    tensor_board_interval = 1
     
     ckpt_folder_path = PathConfig().checkpoints
-    ckpt_interval = gradient_accumulation_interval * 1000
+    ckpt_interval = 1000
     ckpt_seed = 42
     
 
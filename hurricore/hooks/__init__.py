@@ -5,3 +5,8 @@ from hurricore.hooks.lr_scheduler_hook import LRSchedulerHook  # noqa: F401
 from hurricore.hooks.hf_llm_peek_hook import HFLLMPeekHook  # noqa: F401
 from hurricore.hooks.checkpoint_hook import CheckpointHook  # noqa: F401
 from hurricore.hooks.sync_batch_norm_hook import SyncBatchNormHook  # noqa: F401
+from hurricore.hooks.evaluation_hook import EvaluationHook  # noqa: F401
+from hurricore.hooks.metrics_file_hook import MetricsFileHook  # noqa: F401
+from hurricore.hooks.throughput_hook import ThroughputHook  # noqa: F401
+from hurricore.hooks.ema_hook import EMAHook  # noqa: F401
+from hurricore.hooks.layer_freezing_hook import LayerFreezingHook  # noqa: F401
@@ -1,7 +1,14 @@
+import json
+import os
+import shutil
+import signal
+import tempfile
 from pathlib import Path
-from time import sleep
+from threading import Thread
+from time import perf_counter, sleep
 
 import torch
+from accelerate.utils import DistributedType
 from torch.utils.data import RandomSampler
 
 from hurricore.hooks import Hook, LoggerHook
@@ -14,12 +21,27 @@ class CheckpointHook(Hook):
         trainer: Trainer,
         folder_path: Path = None,
         interval: int = 100,
+        interval_unit: str = 'step',
         seed: int = 42,
+        async_save: bool = False,
+        staging_folder_path: Path = None,
+        keep_last: int = None,
+        keep_every: int = None,
+        keep_best: int = None,
+        best_metric: str = 'loss',
+        best_metric_mode: str = 'min',
+        prune_timeout: float = 600.0,
     ) -> None:
         super().__init__(trainer)
         # check validity
         assert interval > 0, 'Checkpoint interval must be greater than 0.'
+        assert interval_unit in ['step', 'sync_step'], 'Invalid interval unit.'
         assert folder_path is not None and folder_path.is_dir(), 'Invalid checkpoint folder path.'
+        assert not async_save or trainer.accelerator.distributed_type not in [DistributedType.DEEPSPEED, DistributedType.FSDP], \
+            'Asynchronous saving is not supported by DeepSpeed and FSDP, whose processes write into shared checkpoint folders.'
+        assert all(n is None or n > 0 for n in [keep_last, keep_every, keep_best]), 'Numbers of kept checkpoints must be greater than 0.'
+        assert best_metric_mode in ['min', 'max'], 'Invalid best metric mode.'
+        assert prune_timeout > 0, 'Prune timeout must be greater than 0.'
         # re-prepare dataloader with seedable sampler if 
         conditions = [
             any(isinstance(dl.sampler, RandomSampler) for dl in trainer.originals.data_loaders),
@@ -39,24 +61,55 @@ class CheckpointHook(Hook):
         # setup self
         self.folder_path = folder_path
         self.interval = interval
+        self.interval_unit = interval_unit
+        self.last_saved_step = None
+        '''
+        With `async_save`, the states are saved by `accelerator.save_state` on the training thread into a staging
+        folder on fast local storage, and moved to `folder_path` in a background thread while training continues,
+        which pays off when `folder_path` is on slow or remote storage. Every process stages its files in its own
+        folder, a temporary one if `staging_folder_path` is not given. A new checkpoint waits for the previous move.
+        '''
+        self.async_save = async_save
+        self.staging_folder_path = staging_folder_path
+        self.is_staging_folder_temporary = staging_folder_path is None
+        self.writer = None
+        self.writer_exception = None
+        '''
+        The main process marks a checkpoint as started before any of its files are written, and every process
+        marks it as completed once its files are written, the main process recording the number of processes that
+        save it. Only checkpoints marked by all of them are resumed from, while checkpoints without any marker were
+        saved before checkpoints were marked, and are taken as completed. Processes of all nodes save into the same
+        folders, which must be on a shared filesystem as required by accelerate, unless `save_on_each_node` is set
+        in the project configuration, with which the processes of every node save and mark their own folders.
+        If any of `keep_last`, `keep_every` and `keep_best` is set, the main process of every folder deletes
+        completed checkpoints kept by none of them in background, after a newer checkpoint is completed. The latest
+        one is always kept, and `keep_best` ranks checkpoints by `best_metric` of the latest evaluation before they
+        were saved. Incomplete checkpoints older than the latest completed one are left by failed saves, and are
+        deleted as well. Pruning is given up if the new checkpoint is not completed within `prune_timeout` seconds,
+        e.g. because another process failed to write it.
+        '''
+        self.keep_last = keep_last
+        self.keep_every = keep_every
+        self.keep_best = keep_best
+        self.best_metric = best_metric
+        self.best_metric_mode = best_metric_mode
+        self.prune_timeout = prune_timeout
+        self.pruner = None
     
     
     def on_training_start(self) -> None:
         # check available checkpoint
-        ckpt_dirs = [d for d in self.folder_path.iterdir() if d.is_dir() and d.name.startswith('ckpt_step_')]
+        ckpt_dirs = self._get_completed_ckpt_dirs()
         if len(ckpt_dirs) == 0:
             return 
         # load latest checkpoint
-        steps = [int(d.name.split('_')[-1]) for d in ckpt_dirs]
-        latest_step = max(steps)
-        latest_ckpt_dir = self.folder_path / f'ckpt_step_{latest_step}'
+        latest_ckpt_dir = ckpt_dirs[max(ckpt_dirs.keys())]
+        if not (latest_ckpt_dir / 'completed_0.json').exists():
+            LoggerHook.msg_queue.append(('warning', f'Checkpoint without completion markers is assumed to be completed: {latest_ckpt_dir}'))
         self.trainer.accelerator.load_state(latest_ckpt_dir)
-        # should step into the next batch
+        self._load_compile_cache(latest_ckpt_dir)
+        # should step into the next batch, dataloaders are fast-forwarded by the trainer
         self.trainer.ctx.batches_idx += 1
-        # recover dataloaders states
-        for dl in self.trainer.data_loaders:
-            dl.set_epoch(self.trainer.ctx.epoch)
-            dl.skip_batches = self.trainer.ctx.batches_idx
         # recover hooks
         for hook in self.trainer.hooks:
             if hasattr(hook, 'recover_from_checkpoint'):
@@ -67,24 +120,262 @@ class CheckpointHook(Hook):
     
     
     def on_step_end(self) -> None:
-        step = self.trainer.ctx.global_step + 1
-        if step % self.interval == 0:
+        if self.interval_unit == 'step' and (self.trainer.ctx.global_step + 1) % self.interval == 0:
+            self._save_checkpoint()
+    
+    
+    def on_optimizer_step(self) -> None:
+        if self.interval_unit == 'sync_step' and self.trainer.ctx.sync_step % self.interval == 0:
             self._save_checkpoint()
 
 
     def on_epoch_end(self) -> None:
-        for dl in self.trainer.data_loaders:
-            dl.skip_batches = 0
         if self.trainer.ctx.epoch + 1 == self.trainer.ctx.num_epochs:
             '''
             This cannot be put in `on_training_end` because LoggerHook will
             shut down its message queue before `on_training_end` is called.
             '''
             self._save_checkpoint()
-            sleep(1)
+            self.wait()
+            LoggerHook.flush()
+    
+    
+    def on_training_end(self) -> None:
+        self.wait()
+        self._remove_temporary_staging_folder()
+    
+    
+    def on_preemption(self) -> None:
+        received_signal = self.trainer.received_signal
+        # the signal may have been received by other processes only
+        signal_name = 'another process' if received_signal is None else signal.Signals(received_signal).name
+        LoggerHook.msg_queue.append(('info', f'Preempted by {signal_name} at step {self.trainer.ctx.global_step + 1}'))
+        # the state may have been saved at this step already
+        if self.last_saved_step != self.trainer.ctx.global_step + 1:
+            self._save_checkpoint()
+        self.wait()
+        self._remove_temporary_staging_folder()
+        # let LoggerHook log its messages before the process exits
+        LoggerHook.flush()
+    
+    
+    def wait(self) -> None:
+        # block until the checkpoint being written and the checkpoints being deleted in background are done
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+        if self.pruner is not None:
+            self.pruner.join()
+            self.pruner = None
+        if self.writer_exception is not None:
+            exception, self.writer_exception = self.writer_exception, None
+            raise exception
+
 
     def _save_checkpoint(self) -> None:
         step = self.trainer.ctx.global_step + 1
         ckpt_path = self.folder_path / f'ckpt_step_{step}'
-        self.trainer.accelerator.save_state(ckpt_path, safe_serialization=False)
-        LoggerHook.msg_queue.append(('info', f'Saved checkpoint at: {ckpt_path}'))
+        self._mark_started(ckpt_path)
+        if self.async_save:
+            self._save_checkpoint_in_background(ckpt_path)
+        else:
+            self.trainer.accelerator.save_state(ckpt_path, safe_serialization=False)
+            self._save_compile_cache(ckpt_path)
+            self._mark_completed(ckpt_path)
+            LoggerHook.msg_queue.append(('info', f'Saved checkpoint at: {ckpt_path}'))
+        self.last_saved_step = step
+        if self._get_marker_index() == 0 and any(n is not None for n in [self.keep_last, self.keep_every, self.keep_best]):
+            self._prune_in_background(ckpt_path)
+    
+    
+    def _save_checkpoint_in_background(self, ckpt_path: Path) -> None:
+        self.wait()
+        start_time = perf_counter()
+        # metrics are taken at the step of saving, as the other states
+        eval_metrics = self._get_eval_metrics()
+        staged_ckpt_path = self._get_staging_folder_path() / ckpt_path.name
+        shutil.rmtree(staged_ckpt_path, ignore_errors=True)
+        self.trainer.accelerator.save_state(staged_ckpt_path, safe_serialization=False)
+        ckpt_path.mkdir(parents=True, exist_ok=True)
+        self._save_compile_cache(ckpt_path)
+        LoggerHook.msg_queue.append(('info', f'Staged checkpoint in {perf_counter() - start_time:.2f}s, moving to: {ckpt_path}'))
+        
+        def move_files():
+            try:
+                for file_path in staged_ckpt_path.iterdir():
+                    shutil.move(file_path, ckpt_path / file_path.name)
+                staged_ckpt_path.rmdir()
+                self._mark_completed(ckpt_path, eval_metrics)
+                LoggerHook.msg_queue.append(('info', f'Saved checkpoint at: {ckpt_path}'))
+            except Exception as e:
+                self.writer_exception = e
+        
+        self.writer = Thread(target=move_files)
+        self.writer.start()
+    
+    
+    def _get_staging_folder_path(self) -> Path:
+        if self.staging_folder_path is None:
+            self.staging_folder_path = Path(tempfile.mkdtemp(prefix='hurricore_checkpoints_'))
+        # processes of a node may share the staging folder
+        staging_folder_path = self.staging_folder_path / f'process_{self.trainer.accelerator.process_index}'
+        staging_folder_path.mkdir(parents=True, exist_ok=True)
+        return staging_folder_path
+    
+    
+    def _remove_temporary_staging_folder(self) -> None:
+        if self.is_staging_folder_temporary and self.staging_folder_path is not None:
+            shutil.rmtree(self.staging_folder_path, ignore_errors=True)
+            self.staging_folder_path = None
+    
+    
+    def _get_eval_metrics(self) -> dict[str, float]:
+        eval_metrics = getattr(self.trainer.ctx, 'eval_metrics', {})
+        return {name: float(value) for name, value in eval_metrics.items()}
+    
+    
+    def _get_marker_index(self) -> int:
+        # with `save_on_each_node`, the checkpoints of every node are marked by the processes of the node
+        accelerator = self.trainer.accelerator
+        if accelerator.project_configuration.save_on_each_node:
+            return accelerator.local_process_index
+        return accelerator.process_index
+    
+    
+    def _get_num_marking_processes(self) -> int:
+        accelerator = self.trainer.accelerator
+        if accelerator.project_configuration.save_on_each_node:
+            return int(os.environ.get('LOCAL_WORLD_SIZE', accelerator.num_processes))
+        return accelerator.num_processes
+    
+    
+    def _write_marker(self, marker_path: Path, marker: dict) -> None:
+        # write then rename, so that a marker is never read half-written
+        temp_path = marker_path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps(marker))
+        temp_path.replace(marker_path)
+    
+    
+    def _mark_started(self, ckpt_path: Path) -> None:
+        if self._get_marker_index() != 0:
+            return
+        ckpt_path.mkdir(parents=True, exist_ok=True)
+        self._write_marker(ckpt_path / 'started.json', {'step': self.trainer.ctx.global_step + 1})
+    
+    
+    def _mark_completed(self, ckpt_path: Path, eval_metrics: dict[str, float] = None) -> None:
+        eval_metrics = self._get_eval_metrics() if eval_metrics is None else eval_metrics
+        marker = {'eval_metrics': eval_metrics}
+        marker_index = self._get_marker_index()
+        if marker_index == 0:
+            # the checkpoint may be resumed from by a different number of processes
+            marker['num_processes'] = self._get_num_marking_processes()
+        self._write_marker(ckpt_path / f'completed_{marker_index}.json', marker)
+    
+    
+    def _is_completed(self, ckpt_path: Path) -> bool:
+        main_marker_path = ckpt_path / 'completed_0.json'
+        if not main_marker_path.exists():
+            # saved before checkpoints were marked, if the last file written by `accelerator.save_state` exists
+            return (
+                not (ckpt_path / 'started.json').exists() 
+                and not any(ckpt_path.glob('completed_*.json')) 
+                and (ckpt_path / 'custom_checkpoint_0.pkl').exists()
+            )
+        num_processes = json.loads(main_marker_path.read_text())['num_processes']
+        return all((ckpt_path / f'completed_{idx}.json').exists() for idx in range(1, num_processes))
+    
+    
+    def _get_ckpt_dirs(self) -> tuple[dict[int, Path], dict[int, Path]]:
+        # split checkpoints into completed and incomplete ones by step
+        ckpt_dirs = {
+            int(d.name.split('_')[-1]): d 
+            for d in self.folder_path.iterdir() 
+            if d.is_dir() and d.name.startswith('ckpt_step_')
+        }
+        completed_dirs, incomplete_dirs = {}, {}
+        for step, ckpt_dir in ckpt_dirs.items():
+            if self._is_completed(ckpt_dir):
+                completed_dirs[step] = ckpt_dir
+            else:
+                incomplete_dirs[step] = ckpt_dir
+        return completed_dirs, incomplete_dirs
+    
+    
+    def _get_completed_ckpt_dirs(self) -> dict[int, Path]:
+        return self._get_ckpt_dirs()[0]
+    
+    
+    def _get_kept_steps(self, ckpt_dirs: dict[int, Path]) -> set[int]:
+        steps = sorted(ckpt_dirs.keys())
+        kept_steps = {steps[-1]}
+        if self.keep_last is not None:
+            kept_steps.update(steps[-self.keep_last:])
+        if self.keep_every is not None:
+            kept_steps.update(step for step in steps if step % self.keep_every == 0)
+        if self.keep_best is not None:
+            metrics = {}
+            for step in steps:
+                marker_path = ckpt_dirs[step] / 'completed_0.json'
+                if not marker_path.exists():
+                    continue
+                marker = json.loads(marker_path.read_text())
+                if self.best_metric in marker['eval_metrics']:
+                    metrics[step] = marker['eval_metrics'][self.best_metric]
+            ranked_steps = sorted(metrics.keys(), key=metrics.get, reverse=self.best_metric_mode == 'max')
+            kept_steps.update(ranked_steps[:self.keep_best])
+        return kept_steps
+    
+    
+    def _prune_in_background(self, ckpt_path: Path) -> None:
+        if self.pruner is not None:
+            self.pruner.join()
+        
+        def prune():
+            # wait until the new checkpoint is written by all processes
+            start_time = perf_counter()
+            while not self._is_completed(ckpt_path):
+                if perf_counter() - start_time > self.prune_timeout:
+                    LoggerHook.msg_queue.append(('warning', f'Skipped pruning, checkpoint is not completed in {self.prune_timeout}s: {ckpt_path}'))
+                    return
+                sleep(0.1)
+            ckpt_dirs, incomplete_dirs = self._get_ckpt_dirs()
+            kept_steps = self._get_kept_steps(ckpt_dirs)
+            latest_step = max(ckpt_dirs.keys())
+            deleted_dirs = [ckpt_dir for step, ckpt_dir in ckpt_dirs.items() if step not in kept_steps]
+            # incomplete checkpoints older than the latest completed one are left by failed saves
+            deleted_dirs += [ckpt_dir for step, ckpt_dir in incomplete_dirs.items() if step < latest_step]
+            for ckpt_dir in deleted_dirs:
+                # unmark first, so that a partially deleted checkpoint is never resumed from
+                for marker_path in ckpt_dir.glob('completed_*.json'):
+                    marker_path.unlink()
+                shutil.rmtree(ckpt_dir, ignore_errors=True)
+                LoggerHook.msg_queue.append(('info', f'Deleted checkpoint at: {ckpt_dir}'))
+        
+        # daemon, so that a crashed process does not keep the others waiting at exit
+        self.pruner = Thread(target=prune, daemon=True)
+        self.pruner.start()
+    
+    
+    def _get_compile_cache_path(self, ckpt_path: Path) -> Path:
+        # every process compiles for its own device
+        return ckpt_path / f'compile_cache_{self.trainer.accelerator.process_index}.bin'
+    
+    
+    def _save_compile_cache(self, ckpt_path: Path) -> None:
+        if not self.trainer.compile_models or not hasattr(torch.compiler, 'save_cache_artifacts'):
+            return
+        artifacts = torch.compiler.save_cache_artifacts()
+        if artifacts is None:
+            return
+        artifact_bytes, _ = artifacts
+        self._get_compile_cache_path(ckpt_path).write_bytes(artifact_bytes)
+    
+    
+    def _load_compile_cache(self, ckpt_path: Path) -> None:
+        cache_path = self._get_compile_cache_path(ckpt_path)
+        if not self.trainer.compile_models or not hasattr(torch.compiler, 'load_cache_artifacts') or not cache_path.exists():
+            return
+        # models are compiled after `on_training_start`, so the restored cache is hit by the first step
+        torch.compiler.load_cache_artifacts(cache_path.read_bytes())
+        LoggerHook.msg_queue.append(('info', f'Loaded compilation cache from: {cache_path}'))
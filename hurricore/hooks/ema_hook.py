@@ -0,0 +1,134 @@
+from contextlib import contextmanager
+from queue import Queue
+from threading import Thread
+from typing import Iterator
+
+import torch
+from torch import nn
+
+from hurricore.hooks import Hook
+from hurricore.trainers import Trainer
+
+
+_STOP_WORKER = object()
+
+
+class EMAHook(Hook):
+    '''
+    Exponential moving average of model weights, updated every `interval` optimizer steps with fused
+    multi-tensor ops. With `offload_to_cpu`, shadow weights live in pinned host memory: parameters are
+    copied without blocking the host and averaged by a long-lived background thread while training continues.
+    Buffers such as BatchNorm statistics are not averaged, the live ones are used with shadow weights.
+    '''
+
+    def __init__(
+        self,
+        trainer: Trainer,
+        models: list[nn.Module] = None,
+        decay: float = 0.9999,
+        interval: int = 1,
+        offload_to_cpu: bool = False,
+    ) -> None:
+        super().__init__(trainer)
+        # check validity
+        assert 0 <= decay < 1, 'EMA decay must be in [0, 1).'
+        assert interval > 0, 'EMA interval must be greater than 0.'
+        # setup self
+        self.models = trainer.originals.models if models is None else models
+        self.decay = decay
+        self.interval = interval
+        self.offload_to_cpu = offload_to_cpu
+        self.params = [p for model in self.models for p in model.parameters() if p.requires_grad]
+        pin_memory = offload_to_cpu and trainer.accelerator.device.type == 'cuda'
+        if offload_to_cpu:
+            self.shadow_params = [torch.empty_like(p, device='cpu', pin_memory=pin_memory) for p in self.params]
+            # parameters are copied here before being averaged on host
+            self._staged_params = [torch.empty_like(p, device='cpu', pin_memory=pin_memory) for p in self.params]
+        else:
+            self.shadow_params = [torch.empty_like(p) for p in self.params]
+        with torch.no_grad():
+            torch._foreach_copy_(self.shadow_params, self.params)
+        # pending host updates, consumed by the worker thread started on the first offloaded update
+        self._update_queue = Queue()
+        self._update_thread = None
+        # shadow weights are saved and loaded with the accelerator state
+        trainer.accelerator.register_for_checkpointing(self)
+
+
+    def on_optimizer_step(self) -> None:
+        if self.trainer.ctx.sync_step % self.interval == 0:
+            self.update()
+
+
+    def on_training_end(self) -> None:
+        self.wait()
+        # stop the worker, it is restarted if the models are updated again
+        if self._update_thread is not None:
+            self._update_queue.put(_STOP_WORKER)
+            self._update_thread.join()
+            self._update_thread = None
+
+
+    @torch.no_grad()
+    def update(self) -> None:
+        if not self.offload_to_cpu:
+            # shadow += (1 - decay) * (param - shadow)
+            torch._foreach_lerp_(self.shadow_params, self.params, 1 - self.decay)
+            return
+        # staged parameters must not be overwritten while the previous update reads them
+        self.wait()
+        ready_event = None
+        for staged_param, param in zip(self._staged_params, self.params):
+            staged_param.copy_(param, non_blocking=True)
+        if self.params[0].is_cuda:
+            ready_event = torch.cuda.Event()
+            ready_event.record()
+        if self._update_thread is None:
+            self._update_thread = Thread(target=self._run_host_updates, daemon=True)
+            self._update_thread.start()
+        self._update_queue.put(ready_event)
+
+
+    def wait(self) -> None:
+        # block until the pending host update has finished
+        self._update_queue.join()
+
+
+    @contextmanager
+    def swap_weights(self) -> Iterator[None]:
+        # temporarily load shadow weights into the models, e.g. for sampling in peek hooks
+        self.wait()
+        with torch.no_grad():
+            backup_params = [p.detach().clone() for p in self.params]
+            torch._foreach_copy_(self.params, self.shadow_params)
+        try:
+            yield
+        finally:
+            with torch.no_grad():
+                torch._foreach_copy_(self.params, backup_params)
+
+
+    def state_dict(self) -> dict:
+        self.wait()
+        return {'shadow_params': self.shadow_params}
+
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        self.wait()
+        with torch.no_grad():
+            torch._foreach_copy_(self.shadow_params, state_dict['shadow_params'])
+
+
+    @torch.no_grad()
+    def _run_host_updates(self) -> None:
+        while True:
+            ready_event = self._update_queue.get()
+            try:
+                if ready_event is _STOP_WORKER:
+                    return
+                # parameters are copied to host without events on CPU
+                if ready_event is not None:
+                    ready_event.synchronize()
+                torch._foreach_lerp_(self.shadow_params, self._staged_params, 1 - self.decay)
+            finally:
+                self._update_queue.task_done()
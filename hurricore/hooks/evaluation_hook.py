@@ -0,0 +1,125 @@
+from itertools import zip_longest
+
+import torch
+from torch.utils.data import DataLoader
+
+from hurricore.hooks import Hook, LoggerHook, TensorBoardHook
+from hurricore.trainers import Trainer
+from hurricore.utils import get_batch_size
+
+
+class EvaluationHook(Hook):
+    def __init__(
+        self,
+        trainer: Trainer,
+        data_loaders: list[DataLoader] = None,
+        interval: int = 1000,
+        interval_unit: str = 'step',
+        seed: int = 42,
+    ) -> None:
+        super().__init__(trainer)
+        # check validity
+        assert interval > 0, 'Evaluation interval must be greater than 0.'
+        assert interval_unit in ['step', 'sync_step'], 'Invalid interval unit.'
+        assert data_loaders is not None and len(data_loaders) > 0, 'Invalid evaluation dataloaders.'
+        # prepared dataloaders are sharded across processes
+        self.data_loaders = [trainer.accelerator.prepare(dl) for dl in data_loaders]
+        # setup self
+        self.interval = interval
+        self.interval_unit = interval_unit
+        self.seed = seed
+
+
+    def on_step_end(self) -> None:
+        if self.interval_unit == 'step' and (self.trainer.ctx.global_step + 1) % self.interval == 0:
+            self.evaluate()
+
+
+    def on_optimizer_step(self) -> None:
+        if self.interval_unit == 'sync_step' and self.trainer.ctx.sync_step % self.interval == 0:
+            self.evaluate()
+
+
+    def evaluate(self) -> dict[str, float]:
+        metrics = self._compute_metrics()
+        self.trainer.ctx.eval_metrics = metrics
+        self._record_metrics(metrics)
+        return metrics
+
+
+    def _compute_metrics(self) -> dict[str, float]:
+        '''
+        Metrics are averaged over all evaluation samples of all processes. Metrics of a batch are either per-sample 
+        values of shape [batch] or means over the batch, which are weighted by the batch size. Samples duplicated by 
+        the prepared dataloaders to even out the last batches of processes are dropped, and the sums of all processes 
+        are reduced in one collective at the end.
+        '''
+        trainer = self.trainer
+        training_batches = trainer.ctx.batches
+        device = trainer.accelerator.device
+        metric_sums = None
+        num_samples = 0
+        # modules deliberately kept in eval mode, e.g. frozen ones, must stay so after evaluation
+        training_modes = {module: module.training for model in trainer.models for module in model.modules()}
+        for model in trainer.models:
+            model.eval()
+        # evaluation must not change the random state of training
+        devices = [device] if device.type == 'cuda' else []
+        with torch.random.fork_rng(devices=devices), torch.no_grad():
+            torch.manual_seed(self.seed)
+            # exhausted dataloaders yield None as in training, so that no batch is left out
+            for batches_idx, batches in enumerate(zip_longest(*self.data_loaders, fillvalue=None)):
+                trainer.ctx.batches = trainer.convert_memory_format(batches)
+                with trainer.accelerator.autocast():
+                    batch_metrics = trainer.compute_eval_metrics()
+                batch_size = get_batch_size(batches)
+                names = list(batch_metrics.keys())
+                # the batch size is taken from the first dataloader with a batch, and so are the duplicated samples
+                data_loader = next(dl for dl, batch in zip(self.data_loaders, batches) if batch is not None)
+                num_batch_samples = self._get_num_unique_samples(data_loader, batches_idx, batch_size)
+                sample_metrics = torch.stack(
+                    [value.detach().float().reshape(-1).expand(batch_size) for value in batch_metrics.values()],
+                    dim=1,
+                )
+                batch_sums = sample_metrics[:num_batch_samples].sum(dim=0)
+                metric_sums = batch_sums if metric_sums is None else metric_sums + batch_sums
+                num_samples += num_batch_samples
+        trainer.ctx.batches = training_batches
+        for module, is_training in training_modes.items():
+            module.train(is_training)
+        if metric_sums is None:
+            return {}
+        totals = torch.cat([metric_sums, torch.tensor([num_samples], dtype=torch.float, device=metric_sums.device)])
+        totals = trainer.accelerator.reduce(totals, reduction='sum').tolist()
+        return {name: total / totals[-1] for name, total in zip(names, totals[:-1])}
+
+
+    def _get_num_unique_samples(self, data_loader: DataLoader, batches_idx: int, batch_size: int) -> int:
+        # processes take turns on consecutive local batches of the dataset, samples past its end are duplicates
+        try:
+            dataset_length = data_loader.total_dataset_length
+        except (AttributeError, TypeError):
+            # datasets without length are not evened out
+            return batch_size
+        num_processes = self.trainer.accelerator.num_processes
+        process_index = self.trainer.accelerator.process_index
+        local_batch_size = data_loader.total_batch_size // num_processes
+        first_sample_idx = (batches_idx * num_processes + process_index) * local_batch_size
+        return max(0, min(batch_size, dataset_length - first_sample_idx))
+
+
+    def _record_metrics(self, metrics: dict[str, float]) -> None:
+        step = self.trainer.ctx.global_step
+        metrics_string = ' | '.join(f'{name}: {value:.5f}' for name, value in metrics.items())
+        LoggerHook.msg_queue.append(('info', f'Evaluation at step {step + 1} | {metrics_string}'))
+        for name, value in metrics.items():
+            TensorBoardHook.msg_queue.append(
+                (
+                    'add_scalar',
+                    {
+                        'tag': f'Evaluation/{name}',
+                        'scalar_value': value,
+                        'global_step': step,
+                    }
+                )
+            )
@@ -22,3 +22,9 @@ class Hook:
 
     def on_step_end(self) -> None:
         pass
+
+    def on_optimizer_step(self) -> None:
+        pass
+
+    def on_preemption(self) -> None:
+        pass
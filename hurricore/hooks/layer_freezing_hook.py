@@ -0,0 +1,97 @@
+from fnmatch import fnmatch
+
+from accelerate.utils import DistributedType
+from torch import nn
+
+from hurricore.hooks import Hook, LoggerHook
+from hurricore.trainers import Trainer
+from hurricore.utils import get_params_details_table, get_num_matmul_params
+
+
+class LayerFreezingHook(Hook):
+    '''
+    Toggles `requires_grad` of parameters of an original model following a schedule, which maps steps to
+    changes applied from then on. Changes map fnmatch patterns of parameter names to whether they are trainable,
+    e.g. `{0: {'model.layers.[0-9].*': False}, 2000: {'model.layers.[0-9].*': True}}` freezes the first ten
+    blocks for 2000 steps. The state at any step is derived from the schedule, so resuming needs no extra state.
+    Optimizers skip parameters without gradients, so their groups are kept while the states of frozen
+    parameters are released, and recreated when the parameters are unfrozen.
+    '''
+    def __init__(
+        self,
+        trainer: Trainer,
+        schedule: dict[int, dict[str, bool]] = None,
+        model: nn.Module = None,
+        interval_unit: str = 'step',
+    ) -> None:
+        super().__init__(trainer)
+        # check validity
+        assert schedule is not None and len(schedule) > 0, 'Invalid layer freezing schedule.'
+        assert interval_unit in ['step', 'sync_step'], 'Invalid interval unit.'
+        assert trainer.accelerator.state.deepspeed_plugin is None, 'DeepSpeed does not support changing trainable parameters after preparation.'
+        if trainer.accelerator.distributed_type == DistributedType.MULTI_GPU:
+            ddp_handler = trainer.accelerator.ddp_handler
+            assert ddp_handler is not None and ddp_handler.find_unused_parameters, 'DDP requires `find_unused_parameters=True` to freeze parameters.'
+        # setup self
+        self.model = trainer.originals.models[0] if model is None else model
+        self.schedule = dict(sorted(schedule.items()))
+        self.interval_unit = interval_unit
+        self.initial_requires_grad = {name: p.requires_grad for name, p in self.model.named_parameters()}
+        for changes in self.schedule.values():
+            for pattern in changes.keys():
+                assert any(fnmatch(name, pattern) for name in self.initial_requires_grad), f'No parameters match {pattern}.'
+
+
+    def on_training_start(self) -> None:
+        self._apply(self._get_next_step())
+
+
+    def recover_from_checkpoint(self) -> None:
+        self._apply(self._get_next_step())
+
+
+    def on_step_start(self) -> None:
+        if self.interval_unit == 'step' and self.trainer.ctx.global_step in self.schedule:
+            self._apply(self.trainer.ctx.global_step)
+
+
+    def on_optimizer_step(self) -> None:
+        if self.interval_unit == 'sync_step' and self.trainer.ctx.sync_step in self.schedule:
+            self._apply(self.trainer.ctx.sync_step)
+
+
+    def _get_next_step(self) -> int:
+        if self.interval_unit == 'sync_step':
+            return self.trainer.ctx.sync_step
+        return getattr(self.trainer.ctx, 'global_step', -1) + 1
+
+
+    def _apply(self, step: int) -> None:
+        requires_grad = dict(self.initial_requires_grad)
+        for schedule_step, changes in self.schedule.items():
+            if schedule_step > step:
+                break
+            for pattern, is_trainable in changes.items():
+                for name in requires_grad.keys():
+                    if fnmatch(name, pattern):
+                        requires_grad[name] = is_trainable
+        frozen_params = []
+        is_changed = False
+        for name, param in self.model.named_parameters():
+            if param.requires_grad == requires_grad[name]:
+                continue
+            param.requires_grad_(requires_grad[name])
+            is_changed = True
+            if not param.requires_grad:
+                param.grad = None
+                frozen_params.append(param)
+        if not is_changed:
+            return
+        for optimizer in self.trainer.optimizers:
+            for param in frozen_params:
+                optimizer.state.pop(param, None)
+        # trainers estimating FLOPs, e.g. HFLLMTrainer, count frozen parameters at fewer FLOPs per token
+        if hasattr(self.trainer, 'num_frozen_matmul_params') and self.model is self.trainer.originals.models[0]:
+            self.trainer.num_frozen_matmul_params = get_num_matmul_params(self.model, requires_grad=False)
+        params_table = get_params_details_table(self.model)
+        LoggerHook.msg_queue.append(('info', f'Trainable parameters changed at {self.interval_unit} {step}:{params_table}'))
@@ -1,8 +1,6 @@
 import time
 from logging import Logger
-from threading import Thread
-
-from torch.cuda import mem_get_info, utilization
+from threading import Thread, Lock
 
 from hurricore.hooks import Hook
 from hurricore.trainers import Trainer
@@ -10,7 +8,6 @@ from hurricore.utils import (
     DummyObject,
     ConfigBase,
     auto_name,
-    get_list_mean,
     get_params_details_table,
 )
 
@@ -18,19 +15,26 @@ from hurricore.utils import (
 class LoggerHook(Hook):
     
     msg_queue = []
+    # messages popped but not logged yet, so that flushing also waits for them
+    _num_processing_msgs = 0
+    _processing_lock = Lock()
+    _is_listening = False
     
     def __init__(
         self, 
         trainer: Trainer,
         logger: Logger,
         interval: int = 1, 
+        interval_unit: str = 'step',
     ) -> None:
         super().__init__(trainer)
         # check validity
         assert interval > 0, 'Log interval must be greater than 0.'
+        assert interval_unit in ['step', 'sync_step'], 'Invalid interval unit.'
         assert logger is not None, 'Invalid logger.'
         # setup self
         self.interval = interval
+        self.interval_unit = interval_unit
         # logger is only for main process
         self.logger = logger if trainer.accelerator.is_main_process else DummyObject()
         self._activate_msg_queue()
@@ -59,31 +63,88 @@ class LoggerHook(Hook):
             self.logger.info(f'{name} structure:\n{model}')
         params_table = get_params_details_table(*models)
         self.logger.info(f'Parameters details:\n{params_table}')
+        self._log_cpu_threads()
         
         self.start_time = time.time()
         self.num_passed_iterations = 0
+        self.is_compile_time_logged = False
+        self.is_saved_activation_memory_logged = False
+        self.num_logged_oom_events = 0
     
     
     def on_epoch_start(self) -> None:
-        self.step_losses = []
+        self.interval_metrics = {}
         self.logger.info(f'Epoch {self.trainer.ctx.epoch + 1} started')
     
         
     def on_step_end(self) -> None:
         self.num_passed_iterations += 1
-        if (self.trainer.ctx.global_step + 1) % self.interval == 0:
-            self._collect_step_loss()
-            self._log_states()
+        self._log_compile_time()
+        self._log_saved_activation_memory()
+        self._log_oom_events()
+        if self.interval_unit == 'step' and (self.trainer.ctx.global_step + 1) % self.interval == 0:
+            self._log_step()
+    
+    
+    def on_optimizer_step(self) -> None:
+        if self.interval_unit == 'sync_step' and self.trainer.ctx.sync_step % self.interval == 0:
+            self._log_step()
       
       
     def on_epoch_end(self) -> None: 
-        avg_loss = get_list_mean(self.step_losses)
+        avg_loss = self.trainer.metrics.read_epoch().get('loss', 0.0)
         self.logger.info(f'Epoch {self.trainer.ctx.epoch + 1} finished with average loss: {avg_loss: .5f}')
     
     
-    def _collect_step_loss(self):
-        step_loss = self.trainer.accelerator.gather(self.trainer.ctx.step_loss).detach().mean().item()
-        self.step_losses.append(step_loss)
+    def _log_cpu_threads(self):
+        if self.trainer.cpu_cores is None:
+            return
+        compute_cores, worker_cores = self.trainer.cpu_cores['compute'], self.trainer.cpu_cores['workers']
+        self.logger.info(
+            f'CPU threads: {len(compute_cores)} intra-op threads pinned to cores {compute_cores} | '
+            f'Data loader workers pinned to cores {worker_cores} | '
+            f'Mixed precision: {self.trainer.accelerator.mixed_precision}'
+        )
+    
+    
+    def _log_compile_time(self):
+        if self.is_compile_time_logged or self.trainer.compile_time is None:
+            return
+        self.logger.info(f'Models compiled in {self.trainer.compile_time:.2f}s (first step including compilation)')
+        self.is_compile_time_logged = True
+        # exclude compilation from the estimated remaining time
+        self.start_time += self.trainer.compile_time
+        self.num_passed_iterations -= 1
+    
+    
+    def _log_saved_activation_memory(self):
+        if self.is_saved_activation_memory_logged or self.trainer.saved_activation_memory is None:
+            return
+        self.logger.info(
+            f'Activation checkpointing of {len(self.trainer.checkpointed_blocks)} blocks saves '
+            f'{self.trainer.saved_activation_memory / 1024 ** 3:.2f} GB of activations per micro-batch'
+        )
+        self.is_saved_activation_memory_logged = True
+    
+    
+    def _log_oom_events(self):
+        for step, batch_shapes, num_splits in self.trainer.oom_events[self.num_logged_oom_events:]:
+            self.logger.warning(
+                f'Out of memory at step {step + 1}, batches of shapes {batch_shapes} are split into {num_splits} micro-batches'
+            )
+        self.num_logged_oom_events = len(self.trainer.oom_events)
+    
+    
+    def _log_step(self):
+        self._read_metrics()
+        self._log_states()
+        self._log_sample_selection()
+        self._log_step_timings()
+    
+    
+    def _read_metrics(self):
+        # metrics pushed since the last log, synchronized once per step for all readers
+        self.interval_metrics = self.trainer.metrics.read('LoggerHook')
     
     
     def _get_remaining_time(self):
@@ -102,7 +163,7 @@ class LoggerHook(Hook):
     
     
     def _log_states(self):
-        if len(self.step_losses) == 0:
+        if len(self.interval_metrics) == 0:
             return
         idx = self.trainer.ctx.batches_idx + 1
         num_epochs = self.trainer.ctx.num_epochs
@@ -110,30 +171,87 @@ class LoggerHook(Hook):
         epoch = self.trainer.ctx.epoch + 1
         progress = (self.trainer.ctx.global_step + 1) / (num_epochs * num_steps_per_epoch)
         remaining_time = self._get_remaining_time()
+        resources = self._format_resources()
         
-        free_memory, total_memory = mem_get_info()
-        used_memory = total_memory - free_memory
-        
+        states = [
+            f"Epoch: {epoch}/{self.trainer.ctx.num_epochs}",
+            f"Step: {idx}/{num_steps_per_epoch}",
+            f"Loss: {self.interval_metrics['loss']:.5f}",
+        ]
+        if 'grad_norm' in self.interval_metrics:
+            states.append(f"Grad norm: {self.interval_metrics['grad_norm']:.5f}")
+        steps_per_second = self.num_passed_iterations / (time.time() - self.start_time + 1e-6)
+        states.extend([f"Steps/s: {steps_per_second:.2f}", f"Progress: {progress:.2%}", f"Time left: {remaining_time}"])
+        if resources:
+            states.append(resources)
+        self.logger.info(' | '.join(states))
+    
+    
+    def _format_resources(self):
+        # latest snapshot of the background monitor, no OS or driver calls here
+        snapshot = dict(self.trainer.resource_monitor.snapshot)
+        items = []
+        if 'cpu_percent' in snapshot:
+            items.append(f"CPU usage: {snapshot.pop('cpu_percent'):.0f}%")
+        if 'host_rss' in snapshot:
+            items.append(f"RSS: {snapshot.pop('host_rss') / 1024 ** 3:.2f} GB")
+        if 'worker_rss' in snapshot:
+            items.append(f"Workers RSS: {snapshot.pop('worker_rss') / 1024 ** 3:.2f} GB")
+        if 'gpu_memory' in snapshot:
+            gpu_memory = snapshot.pop('gpu_memory') / 1024 ** 3
+            if 'gpu_utilization' in snapshot:
+                items.append(f"GPU usage: {snapshot.pop('gpu_utilization')}% w. {gpu_memory:.2f} GB")
+            else:
+                items.append(f"GPU memory: {gpu_memory:.2f} GB")
+        # values of custom samplers
+        items.extend(f"{name}: {value}" for name, value in snapshot.items())
+        return ' | '.join(items)
+    
+    
+    def _log_sample_selection(self):
+        if 'selection_ratio' not in self.interval_metrics:
+            return
         self.logger.info(
-            f"Epoch: {epoch}/{self.trainer.ctx.num_epochs} | "
-            f"Step: {idx}/{num_steps_per_epoch} | "
-            f"Loss: {self.step_losses[-1]:.5f} | "
-            f"Progress: {progress:.2%} | "
-            f"Time left: {remaining_time} | "
-            f"GPU usage: {utilization()}% w. {used_memory / 1024 ** 3:.2f} GB"
+            f"Selective backprop: {self.interval_metrics['selection_ratio']:.2%} of samples | "
+            f"Candidate loss: {self.interval_metrics['candidate_loss']:.5f} | "
+            f"Selected loss: {self.interval_metrics['selected_loss']:.5f}"
         )
     
     
+    def _log_step_timings(self):
+        step_timings = self.trainer.ctx.step_timings
+        if len(step_timings) == 0:
+            return
+        timings_string = ' | '.join(f'{name}: {ms:.2f}' for name, ms in step_timings.items())
+        self.logger.info(f"Step timings (ms): {timings_string}")
+    
+    
+    @classmethod
+    def flush(cls, timeout: float = 10.0) -> None:
+        # block until queued messages are logged, e.g. before the process exits
+        if not LoggerHook._is_listening:
+            return
+        deadline = time.time() + timeout
+        while (len(cls.msg_queue) > 0 or LoggerHook._num_processing_msgs > 0) and time.time() < deadline:
+            time.sleep(0.01)
+    
+    
     def _activate_msg_queue(self):
         def listen_and_process(self):
             while True:
                 if len(self.msg_queue) > 0:
+                    with LoggerHook._processing_lock:
+                        LoggerHook._num_processing_msgs += 1
                     try:
                         method, msg = self.msg_queue.pop(0)
                         getattr(self.logger, method)(msg)
                     except Exception as e:
                         self.logger.exception(e)
+                    finally:
+                        with LoggerHook._processing_lock:
+                            LoggerHook._num_processing_msgs -= 1
                 else:
                     time.sleep(0.01)
         Thread(target=listen_and_process, args=(self, ), daemon=True).start()
+        LoggerHook._is_listening = True
     
\ No newline at end of file
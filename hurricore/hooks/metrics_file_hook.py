@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+from hurricore.hooks import Hook
+from hurricore.trainers import Trainer
+
+
+class MetricsFileHook(Hook):
+    def __init__(
+        self,
+        trainer: Trainer,
+        file_path: Path = None,
+        interval: int = 1,
+        interval_unit: str = 'step',
+    ) -> None:
+        super().__init__(trainer)
+        # check validity
+        assert interval > 0, 'Metrics file interval must be greater than 0.'
+        assert interval_unit in ['step', 'sync_step'], 'Invalid interval unit.'
+        assert file_path is not None and file_path.parent.is_dir(), 'Invalid metrics file path.'
+        # setup self
+        self.file_path = file_path
+        self.interval = interval
+        self.interval_unit = interval_unit
+
+
+    def on_step_end(self) -> None:
+        if self.interval_unit == 'step' and (self.trainer.ctx.global_step + 1) % self.interval == 0:
+            self._write_metrics()
+
+
+    def on_optimizer_step(self) -> None:
+        if self.interval_unit == 'sync_step' and self.trainer.ctx.sync_step % self.interval == 0:
+            self._write_metrics()
+
+
+    def _write_metrics(self) -> None:
+        # all processes take part in the synchronization, only the main process writes
+        metrics = self.trainer.metrics.read('MetricsFileHook')
+        if not self.trainer.accelerator.is_main_process or len(metrics) == 0:
+            return
+        record = {
+            'epoch': self.trainer.ctx.epoch,
+            'step': self.trainer.ctx.global_step + 1,
+            **metrics,
+        }
+        with open(self.file_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
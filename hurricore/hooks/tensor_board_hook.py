@@ -1,4 +1,5 @@
 import time
+from collections import deque
 from pathlib import Path
 from threading import Thread
 
@@ -11,21 +12,27 @@ from hurricore.utils import DummyObject, auto_name
 
 
 class TensorBoardHook(Hook):
-    msg_queue = []
+    # bounded, so that the oldest messages are dropped if no `TensorBoardHook` consumes them
+    msg_queue = deque(maxlen=10000)
+    # tags of metrics in the trainer's registry, others are recorded under `Metrics/`, `None` skips a metric
+    metric_tags = {'loss': 'Loss/Training', 'grad_norm': 'Gradients/Norm'}
     
     def __init__(
         self, 
         trainer: Trainer,
         folder_path: Path = None,
         interval: int = 1,
+        interval_unit: str = 'step',
         record_grad: bool = False,
     ) -> None:
         super().__init__(trainer)
         # check validity
         assert interval > 0, 'TensorBoard interval must be greater than 0.'
+        assert interval_unit in ['step', 'sync_step'], 'Invalid interval unit.'
         assert folder_path is not None and folder_path.is_dir(), 'Invalid TensorBoard folder path.'
         # setup self
         self.interval = interval
+        self.interval_unit = interval_unit
         self.folder_path = folder_path
         self.record_grad = record_grad
         self.writer = SummaryWriter(log_dir=self.folder_path) if trainer.accelerator.is_main_process else DummyObject()
@@ -41,11 +48,13 @@ class TensorBoardHook(Hook):
     
     
     def on_step_end(self) -> None:
-        step = self.trainer.ctx.global_step 
-        if (step + 1) % self.interval == 0:
-            loss = self.trainer.accelerator.gather(self.trainer.ctx.step_loss).detach().mean().item()
-            self.writer.add_scalar('Loss/Training', loss, step)
-            self.writer.flush()
+        if self.interval_unit == 'step' and (self.trainer.ctx.global_step + 1) % self.interval == 0:
+            self._record_step()
+    
+    
+    def on_optimizer_step(self) -> None:
+        if self.interval_unit == 'sync_step' and self.trainer.ctx.sync_step % self.interval == 0:
+            self._record_step()
                  
                    
     def on_epoch_end(self) -> None:
@@ -69,12 +78,38 @@ class TensorBoardHook(Hook):
         self.writer.close()
         
 
+    def _record_step(self) -> None:
+        step = self.trainer.ctx.global_step
+        # metrics pushed since the last record, synchronized once per step for all readers
+        metrics = self.trainer.metrics.read('TensorBoardHook')
+        for name, value in metrics.items():
+            tag = self.metric_tags.get(name, f'Metrics/{name}')
+            if tag is not None:
+                self.writer.add_scalar(tag, value, step)
+        self.writer.flush()
+        self._record_step_timings()
+
+
+    def _record_step_timings(self) -> None:
+        for name, ms in self.trainer.ctx.step_timings.items():
+            self.msg_queue.append(
+                (
+                    'add_scalar',
+                    {
+                        'tag': f'Step Timings (ms)/{name}',
+                        'scalar_value': ms,
+                        'global_step': self.trainer.ctx.global_step,
+                    }
+                )
+            )
+
+
     def _activate_msg_queue(self):
         def listen_and_process(self):
             while True:
                 if len(self.msg_queue) > 0:
                     try:
-                        method, kwargs = self.msg_queue.pop(0)
+                        method, kwargs = self.msg_queue.popleft()
                         getattr(self.writer, method)(**kwargs)
                     except Exception as e:
                         LoggerHook.msg_queue.append(('error', f'Error in TensorBoardHook: {e}'))
@@ -0,0 +1,82 @@
+import time
+
+from hurricore.hooks import Hook, LoggerHook, TensorBoardHook
+from hurricore.trainers import Trainer
+
+
+class ThroughputHook(Hook):
+    # counters in the trainer's metrics registry and their names in reports
+    counters = {
+        'num_samples': 'samples/s',
+        'num_tokens': 'tokens/s',
+        'num_supervised_tokens': 'supervised tokens/s',
+    }
+    
+    def __init__(
+        self,
+        trainer: Trainer,
+        interval: int = 1,
+        interval_unit: str = 'step',
+        peak_flops: float = None,
+    ) -> None:
+        super().__init__(trainer)
+        # check validity
+        assert interval > 0, 'Throughput interval must be greater than 0.'
+        assert interval_unit in ['step', 'sync_step'], 'Invalid interval unit.'
+        assert peak_flops is None or peak_flops > 0, 'Peak FLOPs must be greater than 0.'
+        # setup self
+        self.interval = interval
+        self.interval_unit = interval_unit
+        # peak FLOP/s of a single device for the training precision, e.g. 312e12 for A100 in bf16
+        self.peak_flops = peak_flops
+        self.throughputs = {}
+
+
+    def on_epoch_start(self) -> None:
+        # the metrics registry restarts counting at every epoch
+        self.last_time = time.perf_counter()
+
+
+    def on_step_end(self) -> None:
+        if self.interval_unit == 'step' and (self.trainer.ctx.global_step + 1) % self.interval == 0:
+            self._report_throughputs()
+
+
+    def on_optimizer_step(self) -> None:
+        if self.interval_unit == 'sync_step' and self.trainer.ctx.sync_step % self.interval == 0:
+            self._report_throughputs()
+
+
+    def _report_throughputs(self) -> None:
+        # reading the registry waits for the device, so the wall time covers all counted work
+        metrics = self.trainer.metrics.read('ThroughputHook')
+        current_time = time.perf_counter()
+        elapsed_time = current_time - self.last_time
+        self.last_time = current_time
+        num_processes = self.trainer.accelerator.num_processes
+        throughputs = {}
+        for counter, name in self.counters.items():
+            if counter in metrics:
+                throughputs[f'global {name}'] = metrics[counter] / elapsed_time
+                throughputs[f'per-rank {name}'] = metrics[counter] / elapsed_time / num_processes
+        if 'model_flops' in metrics:
+            achieved_flops = metrics['model_flops'] / elapsed_time / num_processes
+            throughputs['per-rank TFLOP/s'] = achieved_flops / 1e12
+            if self.peak_flops is not None:
+                throughputs['MFU'] = achieved_flops / self.peak_flops
+        if len(throughputs) == 0:
+            return
+        self.throughputs = throughputs
+        throughputs_string = ' | '.join(f'{name}: {value:.2f}' for name, value in throughputs.items())
+        LoggerHook.msg_queue.append(('info', f'Throughput: {throughputs_string}'))
+        for name, value in throughputs.items():
+            TensorBoardHook.msg_queue.append(
+                (
+                    'add_scalar',
+                    {
+                        'tag': f'Throughput/{name}',
+                        'scalar_value': value,
+                        'global_step': self.trainer.ctx.global_step,
+                    }
+                )
+            )
@@ -1,7 +1,10 @@
+from contextlib import contextmanager
 from logging import Logger
 from pathlib import Path
+from types import MethodType
 
 import torch
+from torch import nn
 from torch.optim import Optimizer
 from torch.optim.lr_scheduler import LRScheduler
 from torch.utils.data import DataLoader
@@ -15,6 +18,16 @@ from hurricore.hooks import(
     LRSchedulerHook, 
     TensorBoardHook, 
     CheckpointHook,
+    EvaluationHook,
+    ThroughputHook,
+    LayerFreezingHook,
+)
+from hurricore.utils import (
+    compute_causal_lm_loss, 
+    compute_per_sample_causal_lm_loss,
+    estimate_flops_per_token, 
+    get_num_matmul_params,
+    split_batches,
 )
 
 
@@ -27,7 +40,9 @@ class HFLLMTrainer(Trainer):
         optimizer: Optimizer,
         accelerator: Accelerator,
         num_epochs: int = 100,
-        
+        interval_unit: str = 'step',
+        loss_chunk_size: int = None,
+        skip_prompt_logits: bool = False,
         
         logger: Logger = None,
         log_interval: int = 1,
@@ -45,16 +60,47 @@ class HFLLMTrainer(Trainer):
         ckpt_folder_path: Path = None,
         ckpt_interval: int = 1000,
         ckpt_seed: int = 42,
+        ckpt_async_save: bool = False,
+        ckpt_keep_last: int = None,
+        ckpt_keep_every: int = None,
+        ckpt_keep_best: int = None,
+        ckpt_best_metric: str = 'loss',
+        
+        eval_data_loader: DataLoader = None,
+        eval_interval: int = 1000,
+        
+        peak_flops: float = None,
+        
+        layer_freezing_schedule: dict[int, dict[str, bool]] = None,
         
+        **kwargs,
     ) -> None:
+        # count parameters before they are possibly partitioned by DeepSpeed
+        num_matmul_params = get_num_matmul_params(model)
+        num_frozen_matmul_params = get_num_matmul_params(model, requires_grad=False)
         super().__init__(
             models=[model], 
             optimizers=[optimizer], 
             data_loaders=[data_loader], 
             accelerator=accelerator,
             num_epochs=num_epochs,
+            **kwargs,
         )
         
+        if loss_chunk_size is not None or skip_prompt_logits or self.selective_backprop_ratio is not None:
+            assert loss_chunk_size is None or loss_chunk_size > 0, 'Loss chunk size must be greater than 0.'
+            assert getattr(model.config, 'final_logit_softcapping', None) is None, 'Logit soft-capping is not supported by hidden states loss.'
+            '''
+            The wrapped model is run to keep distributed and mixed precision hooks, but the LM head is skipped so 
+            that the loss can be computed from hidden states. The LM head is patched once here, rather than swapped 
+            on every forward, so that the model structure and parameter names never change, e.g. for compilation.
+            '''
+            _make_lm_head_skippable(model.get_output_embeddings())
+        self.loss_chunk_size = loss_chunk_size
+        self.skip_prompt_logits = skip_prompt_logits
+        self.num_matmul_params = num_matmul_params
+        self.num_frozen_matmul_params = num_frozen_matmul_params
+        
         if peek_prompts is None:
             peek_prompts = []
             
@@ -64,11 +110,13 @@ class HFLLMTrainer(Trainer):
                 prompts=peek_prompts, 
                 tokenizer=tokenizer, 
                 interval=peek_interval,
+                interval_unit=interval_unit,
             ),
             LoggerHook(
                 trainer=self,
                 logger=logger, 
                 interval=log_interval,
+                interval_unit=interval_unit,
             ),
             LRSchedulerHook(
                 trainer=self,
@@ -79,17 +127,58 @@ class HFLLMTrainer(Trainer):
                 trainer=self,
                 folder_path=tensor_board_folder_path,
                 interval=tensor_board_interval,
+                interval_unit=interval_unit,
+            ),
+            ThroughputHook(
+                trainer=self,
+                interval=log_interval,
+                interval_unit=interval_unit,
+                peak_flops=peak_flops,
             ),
             CheckpointHook(
                 trainer=self,
                 folder_path=ckpt_folder_path,
                 interval=ckpt_interval,
+                interval_unit=interval_unit,
                 seed=ckpt_seed,
+                async_save=ckpt_async_save,
+                keep_last=ckpt_keep_last,
+                keep_every=ckpt_keep_every,
+                keep_best=ckpt_keep_best,
+                best_metric=ckpt_best_metric,
             ),
         ]
+        if eval_data_loader is not None:
+            # evaluate before checkpointing so that checkpoints are ranked by the metrics of their own step
+            self.hooks.insert(
+                -1,
+                EvaluationHook(
+                    trainer=self,
+                    data_loaders=[eval_data_loader],
+                    interval=eval_interval,
+                    interval_unit=interval_unit,
+                ),
+            )
+        if layer_freezing_schedule is not None:
+            self.hooks.append(
+                LayerFreezingHook(
+                    trainer=self,
+                    schedule=layer_freezing_schedule,
+                    interval_unit=interval_unit,
+                )
+            )
+    
+    def training_step(self) -> torch.Tensor:
+        if self.selective_backprop_ratio is not None:
+            # all candidates are run forward to select the samples to train on
+            self._push_token_counts(include_backward=False)
+        return super().training_step()
+    
     
     def compute_loss(self) -> torch.Tensor:
         input_ids, attention_masks, labels = self.ctx.batches[0]
+        if self.loss_chunk_size is not None or self.skip_prompt_logits:
+            return self._compute_hidden_states_loss(input_ids, attention_masks, labels)
         model = self.models[0]
         loss = model(
             input_ids=input_ids,
@@ -98,3 +187,112 @@ class HFLLMTrainer(Trainer):
             use_cache=False,
         )[0]
         return loss
+    
+    
+    def compute_per_sample_loss(self) -> torch.Tensor:
+        input_ids, attention_masks, labels = self.ctx.batches[0]
+        with self._skip_lm_head() as lm_head:
+            hidden_states = self.models[0](
+                input_ids=input_ids,
+                attention_mask=attention_masks,
+                use_cache=False,
+            )[0]
+        return compute_per_sample_causal_lm_loss(
+            hidden_states=hidden_states,
+            labels=labels,
+            lm_head=lm_head,
+            chunk_size=self.loss_chunk_size,
+            skip_ignored_labels=self.skip_prompt_logits,
+        )
+    
+    
+    def _compute_hidden_states_loss(
+        self, 
+        input_ids: torch.Tensor, 
+        attention_masks: torch.Tensor, 
+        labels: torch.Tensor,
+    ) -> torch.Tensor:
+        with self._skip_lm_head() as lm_head:
+            hidden_states = self.models[0](
+                input_ids=input_ids,
+                attention_mask=attention_masks,
+                use_cache=False,
+            )[0]
+        return compute_causal_lm_loss(
+            hidden_states=hidden_states,
+            labels=labels,
+            lm_head=lm_head,
+            chunk_size=self.loss_chunk_size,
+            skip_ignored_labels=self.skip_prompt_logits,
+        )
+    
+    
+    def get_micro_batches(self, batches: tuple, num_splits: int) -> list[tuple[tuple, float]]:
+        # the loss is averaged over supervised tokens, micro-batches without any are skipped
+        _, _, labels = batches[0]
+        num_supervised_tokens = (labels[:, 1:] != -100).sum().item()
+        if num_supervised_tokens == 0:
+            # nothing to skip, weights proportional to samples keep the loss of the whole batches
+            return Trainer.get_micro_batches(self, batches, num_splits)
+        micro_batches_and_weights = []
+        for micro_batches in split_batches(batches, num_splits):
+            _, _, micro_labels = micro_batches[0]
+            num_micro_supervised_tokens = (micro_labels[:, 1:] != -100).sum().item()
+            if num_micro_supervised_tokens > 0:
+                micro_batches_and_weights.append((micro_batches, num_micro_supervised_tokens / num_supervised_tokens))
+        return micro_batches_and_weights
+    
+    
+    def _run_forward_backward(self) -> torch.Tensor:
+        # tokens are counted on the batches trained on, i.e. the samples picked by selective backprop
+        self._push_token_counts()
+        return super()._run_forward_backward()
+    
+    
+    def _push_token_counts(self, include_backward: bool = True) -> None:
+        # counted on device from the collator output, synchronized by the metrics registry
+        input_ids, attention_masks, labels = self.ctx.batches[0]
+        num_tokens = attention_masks.sum()
+        config = self.originals.models[0].config
+        flops_per_token = estimate_flops_per_token(
+            num_matmul_params=self.num_matmul_params,
+            num_layers=config.num_hidden_layers,
+            hidden_size=config.hidden_size,
+            seq_len=input_ids.size(1),
+            num_frozen_matmul_params=self.num_frozen_matmul_params,
+            include_backward=include_backward,
+        )
+        if not include_backward:
+            # forward passes of candidates only add to the work done, not to the tokens trained on
+            self.metrics.push('model_flops', num_tokens * flops_per_token, reduction='sum')
+            return
+        self.metrics.push('num_samples', input_ids.size(0), reduction='sum')
+        self.metrics.push('num_tokens', num_tokens, reduction='sum')
+        self.metrics.push('num_supervised_tokens', (labels[:, 1:] != -100).sum(), reduction='sum')
+        self.metrics.push('model_flops', num_tokens * flops_per_token, reduction='sum')
+    
+    
+    @contextmanager
+    def _skip_lm_head(self):
+        # the LM head returns hidden states within this context, and logits when called outside of it
+        lm_head = self.originals.models[0].get_output_embeddings()
+        lm_head.is_forward_skipped = True
+        try:
+            yield lm_head
+        finally:
+            lm_head.is_forward_skipped = False
+
+
+def _skippable_forward(lm_head: nn.Module, hidden_states: torch.Tensor) -> torch.Tensor:
+    if lm_head.is_forward_skipped:
+        return hidden_states
+    return lm_head.unskipped_forward(hidden_states)
+
+
+def _make_lm_head_skippable(lm_head: nn.Module) -> None:
+    if hasattr(lm_head, 'unskipped_forward'):
+        return
+    lm_head.unskipped_forward = lm_head.forward
+    lm_head.is_forward_skipped = False
+    # bound methods are rebound to copies of the module, e.g. by `copy.deepcopy`
+    lm_head.forward = MethodType(_skippable_forward, lm_head)
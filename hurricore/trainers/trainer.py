@@ -1,13 +1,44 @@
-from typing import Iterable
-from itertools import zip_longest
+import gc
+import os
+import signal
+import sys
+from contextlib import ExitStack, contextmanager
+from threading import current_thread, main_thread
+from time import perf_counter
+from typing import Callable, Iterable, Iterator
 
+import torch
 from accelerate import Accelerator
+from accelerate.data_loader import DataLoaderDispatcher
 from torch import Tensor
 from torch import nn
 from torch.optim import Optimizer
 from torch.utils.data import DataLoader
 
-from hurricore.utils import Context
+from hurricore.utils import (
+    Context, 
+    StepTimer, 
+    BatchPrefetcher, 
+    MultiLoaderIterator,
+    MetricsRegistry,
+    ResourceMonitor,
+    apply_activation_checkpointing,
+    get_saved_activation_memory,
+    get_batch_shapes,
+    get_batch_size,
+    split_batches,
+    select_batches,
+    to_memory_format,
+    get_available_cores,
+    split_cores,
+    pin_threads,
+    PinnedWorkerInit,
+)
+
+
+_END_OF_ITERATION = object()
+# hook events that run every step, others run once and are not part of step timings
+_STEP_EVENTS = ('on_step_start', 'on_optimizer_step', 'on_step_end')
 
 
 class Trainer:
@@ -18,7 +49,59 @@ class Trainer:
         data_loaders: list[DataLoader],
         accelerator: Accelerator,
         num_epochs: int = 100,
+        prefetch_size: int = 0,
+        iteration_strategy: str = 'zip_longest',
+        iteration_weights: list[float] = None,
+        iteration_seed: int = 42,
+        compile_models: bool = False,
+        compile_mode: str = None,
+        compile_dynamic: bool = None,
+        compile_backend: str = 'inductor',
+        activation_checkpointing: bool = False,
+        activation_checkpointing_policy: list[str | type] | Callable[[str, nn.Module], bool] = None,
+        resource_monitor_interval: float = 5.0,
+        preemption_signals: list[int] = (signal.SIGTERM, ),
+        preemption_check_interval: int = 10,
+        preemption_exit_code: int = 75,
+        split_batches_on_oom: bool = True,
+        selective_backprop_ratio: float = None,
+        selective_backprop_strategy: str = 'top_k',
+        max_grad_norm: float = None,
+        memory_format: str = None,
+        pin_cpu_threads: bool = False,
     ) -> None:
+        # check validity
+        assert prefetch_size >= 0, 'Prefetch size must be non-negative.'
+        assert compile_mode in [None, 'default', 'reduce-overhead', 'max-autotune', 'max-autotune-no-cudagraphs'], 'Invalid compile mode.'
+        assert iteration_strategy in MultiLoaderIterator.strategies, 'Invalid iteration strategy.'
+        assert preemption_check_interval > 0, 'Preemption check interval must be greater than 0.'
+        assert selective_backprop_ratio is None or 0 < selective_backprop_ratio <= 1, 'Selective backprop ratio must be in (0, 1].'
+        assert selective_backprop_strategy in ['top_k', 'sample'], 'Invalid selective backprop strategy.'
+        assert max_grad_norm is None or max_grad_norm > 0, 'Max gradient norm must be greater than 0.'
+        assert memory_format in [None, 'contiguous_format', 'channels_last', 'channels_last_3d'], 'Invalid memory format.'
+        # DeepSpeed clips gradients inside its engine, configured before preparation
+        if max_grad_norm is not None and accelerator.state.deepspeed_plugin is not None:
+            accelerator.state.deepspeed_plugin.deepspeed_config['gradient_clipping'] = max_grad_norm
+        # recompute activations of selected blocks in backward, must be applied before wrapping models
+        self.checkpointed_blocks = []
+        if activation_checkpointing:
+            for model in models:
+                self.checkpointed_blocks.extend(apply_activation_checkpointing(model, activation_checkpointing_policy))
+            assert len(self.checkpointed_blocks) > 0, 'No blocks are selected for activation checkpointing.'
+        # activation bytes per micro-batch freed by checkpointing, measured on the first step
+        self.saved_activation_memory = None
+        '''
+        Convolution weights are converted in place before wrapping models, so that optimizers keep their
+        parameters, and DDP gradient buckets are laid out with the same strides as the gradients.
+        '''
+        self.memory_format = None if memory_format is None else getattr(torch, memory_format)
+        if self.memory_format is not None:
+            for model in models:
+                model.to(memory_format=self.memory_format)
+        # divide cores between processes and their data loader workers when training on CPU, must be set before preparing data loaders
+        self.cpu_cores = None
+        if pin_cpu_threads and accelerator.device.type == 'cpu':
+            self.cpu_cores = self._pin_cpu_threads(accelerator, data_loaders)
         # backup original objects
         self.originals = Context(
             models=models,
@@ -31,8 +114,60 @@ class Trainer:
         self.data_loaders = all_accelerated_objects[len(models):len(models) + len(data_loaders)]
         self.optimizers = all_accelerated_objects[len(models) + len(data_loaders):]
         self.accelerator = accelerator
-        # setup context and number of epochs
-        self.ctx = Context(num_epochs=num_epochs)
+        '''
+        When prefetching, dataloaders are iterated ahead of the training step in a background thread, and with
+        multiple dataloaders, each of them ends at a different step of an epoch. In both cases, gradient
+        accumulation boundaries are aligned with epochs by the trainer rather than by the dataloaders.
+        Dispatching dataloaders broadcast batches with collectives while iterating, which must stay on the main thread.
+        '''
+        if prefetch_size > 0:
+            assert not any(isinstance(dl, DataLoaderDispatcher) for dl in self.data_loaders), 'Prefetching does not support dispatching batches.'
+        self.aligns_accumulation_with_epochs = prefetch_size > 0 or len(self.data_loaders) > 1
+        if self.aligns_accumulation_with_epochs:
+            accelerator.gradient_state.plugin_kwargs['sync_with_dataloader'] = False
+        self.prefetch_size = prefetch_size
+        self.iteration_strategy = iteration_strategy
+        self.iteration_weights = iteration_weights
+        self.iteration_seed = iteration_seed
+        self.compile_models = compile_models
+        self.compile_mode = compile_mode
+        self.compile_dynamic = compile_dynamic
+        self.compile_backend = compile_backend
+        # wall time of the first compiled step in seconds, measured on every run
+        self.compile_time = None
+        # setup context and number of epochs, only the progress counters are checkpointed
+        self.ctx = Context(
+            num_epochs=num_epochs,
+            persistent_keys=['epoch', 'batches_idx', 'global_step', 'sync_step'],
+        )
+        # setup timer for per-phase step timing
+        self.timer = StepTimer(device=accelerator.device)
+        # setup registry of scalars shared by hooks and reduced across processes at once
+        self.metrics = MetricsRegistry(accelerator)
+        # setup resource sampling in background, hooks only read the latest snapshot
+        self.resource_monitor = ResourceMonitor(device=accelerator.device, interval=resource_monitor_interval)
+        '''
+        Setup graceful exit on preemption. With several processes, checking is a collective whose result is read
+        on host, so it is only done every `preemption_check_interval` optimizer steps, otherwise on every one.
+        '''
+        self.preemption_signals = list(preemption_signals)
+        self.preemption_check_interval = preemption_check_interval
+        self.preemption_exit_code = preemption_exit_code
+        self.received_signal = None
+        # setup splitting of batches that run out of memory, with the learned number of splits per batch shapes
+        self.split_batches_on_oom = split_batches_on_oom
+        self.oom_num_splits = {}
+        # (global step, batch shapes, number of splits) of every out-of-memory retry, logged by `LoggerHook`
+        self.oom_events = []
+        self._is_backward_started = False
+        '''
+        With selective backprop, the loaded batches are candidates, and only the given ratio of samples with
+        the highest losses, or sampled proportionally to their losses, are trained on.
+        '''
+        self.selective_backprop_ratio = selective_backprop_ratio
+        self.selective_backprop_strategy = selective_backprop_strategy
+        # clip the global gradient norm of all models on sync steps, `float('inf')` only records the norm
+        self.max_grad_norm = max_grad_norm
         # initialize hooks list
         self.hooks = []
     
@@ -41,45 +176,85 @@ class Trainer:
         # initialize context variables
         self.ctx.epoch = 0
         self.ctx.batches_idx = 0
-        # execute hooks on training start
-        for hook in self.hooks:
-            hook.on_training_start()
-        # iterate over epochs
-        for epoch in range(self.ctx.epoch, self.ctx.num_epochs):
-            # update context variables
-            self.ctx.epoch = epoch
-            # execute hooks on epoch start
-            for hook in self.hooks:
-                hook.on_epoch_start()
-            # iterate over batches
-            for batches_idx, batches in enumerate(
-                iterable=self.build_iterator(), 
-                start=self.data_loaders[0].skip_batches
-            ):
-                # update context variables
-                self.ctx.batches_idx = batches_idx
-                self.ctx.batches = batches
-                self._set_global_step()
-                # execute hooks on step start
-                for hook in self.hooks:
-                    hook.on_step_start()
-                # execute training step and collect loss
-                self.ctx.step_loss = self.training_step()
-                # execute hooks on step end
-                for hook in self.hooks:
-                    hook.on_step_end()
-            # execute hooks on epoch end
-            for hook in self.hooks:
-                hook.on_epoch_end()
-        # execute hooks on training end
-        for hook in self.hooks:
-            hook.on_training_end()
+        self.ctx.sync_step = 0
+        self.resource_monitor.start()
+        try:
+            with self._catch_preemption_signals():
+                # execute hooks on training start
+                self._call_hooks('on_training_start')
+                # compile models after hooks have modified them and restored the compilation cache
+                if self.compile_models:
+                    self._compile_models()
+                # iterate over epochs
+                for epoch in range(self.ctx.epoch, self.ctx.num_epochs):
+                    # update context variables
+                    self.ctx.epoch = epoch
+                    self.metrics.reset()
+                    # execute hooks on epoch start
+                    self._call_hooks('on_epoch_start')
+                    # iterate over batches
+                    for batches_idx, batches in enumerate(
+                        iterable=self._iterate_with_timing(self.build_iterator()), 
+                        start=self.ctx.batches_idx
+                    ):
+                        # update context variables
+                        self.ctx.batches_idx = batches_idx
+                        self.ctx.batches = self.convert_memory_format(batches)
+                        self._set_global_step()
+                        if self.aligns_accumulation_with_epochs:
+                            self._set_gradient_accumulation_step()
+                        self.ctx.step_timings = self.timer.get_summary()  # milliseconds
+                        # execute hooks on step start
+                        self._call_hooks('on_step_start')
+                        # execute training step and collect loss
+                        if self.compile_models and self.compile_time is None:
+                            self._run_compile_warmup_step()
+                        else:
+                            with self.timer.record('training_step', on_device=True):
+                                self.ctx.step_loss = self.training_step()
+                        self.metrics.push('loss', self.ctx.step_loss)
+                        if len(self.checkpointed_blocks) > 0 and self.saved_activation_memory is None:
+                            self.saved_activation_memory = get_saved_activation_memory(self.checkpointed_blocks)
+                        # execute hooks on optimizer step if gradients were synchronized
+                        if self.accelerator.sync_gradients:
+                            self.ctx.sync_step += 1
+                            self._call_hooks('on_optimizer_step')
+                        # execute hooks on step end
+                        self._call_hooks('on_step_end')
+                        # checkpoint and exit after a completed optimizer step if any process received a preemption signal
+                        if self.accelerator.sync_gradients and self._is_preempted():
+                            self._exit_on_preemption()
+                    # execute hooks on epoch end
+                    self._call_hooks('on_epoch_end')
+                    # next epoch starts from the first batch
+                    self.ctx.batches_idx = 0
+                # execute hooks on training end
+                self._call_hooks('on_training_end')
+        finally:
+            # also stop sampling when training fails or exits on preemption
+            self.resource_monitor.stop()
     
     
     def build_iterator(self) -> Iterable:
-        # build iterator for data loaders and add number of steps per epoch to context
-        self.ctx.num_steps_per_epoch = max([len(dl) for dl in self.data_loaders])
-        return zip_longest(*self.data_loaders, fillvalue=None)
+        # build iterator for data loaders starting from current batch and add number of steps per epoch to context
+        iterator = MultiLoaderIterator(
+            data_loaders=self.data_loaders,
+            strategy=self.iteration_strategy,
+            weights=self.iteration_weights,
+            seed=self.iteration_seed,
+            epoch=self.ctx.epoch,
+            start_step=self.ctx.batches_idx,
+        )
+        self.ctx.num_steps_per_epoch = len(iterator)
+        # prepare next batches in background if prefetching is enabled
+        if self.prefetch_size > 0:
+            iterator = BatchPrefetcher(
+                iterable=iterator,
+                data_loaders=self.data_loaders,
+                size=self.prefetch_size,
+                device=self.accelerator.device,
+            )
+        return iterator
 
     
     def training_step(self) -> Tensor:
@@ -91,14 +266,22 @@ class Trainer:
             # zero gradients
             for optimizer in self.optimizers:
                 optimizer.zero_grad()
-            # forward pass with mixed precision
-            with self.accelerator.autocast():
-                loss = self.compute_loss()
-            # backward pass to compute gradients
-            self.accelerator.backward(loss)
+            # keep the hardest samples of the candidates if selective backprop is enabled
+            candidate_batches = self.ctx.batches
+            if self.selective_backprop_ratio is not None:
+                with self.timer.record('sample_selection', on_device=True):
+                    self.ctx.batches = self._select_samples(candidate_batches)
+            # forward and backward passes, split into micro-batches if the batches do not fit in memory
+            loss = self._run_forward_backward()
+            self.ctx.batches = candidate_batches
+            # clip gradients once they are accumulated and synchronized
+            if self.max_grad_norm is not None and self.accelerator.sync_gradients:
+                with self.timer.record('clip_grad_norm', on_device=True):
+                    self._clip_grad_norm()
             # update parameters using gradients
-            for optimizer in self.optimizers:
-                optimizer.step()
+            with self.timer.record('optimizer_step', on_device=True):
+                for optimizer in self.optimizers:
+                    optimizer.step()
             # return loss for context tracking
             return loss
     
@@ -107,6 +290,39 @@ class Trainer:
         raise NotImplementedError
     
     
+    def compute_per_sample_loss(self) -> Tensor:
+        # losses of every sample in `self.ctx.batches`, of shape [batch], required by selective backprop
+        raise NotImplementedError
+    
+    
+    def get_micro_batches(self, batches: tuple, num_splits: int) -> list[tuple[tuple, float]]:
+        '''
+        Split `batches` into micro-batches with loss weights, so that the weighted sum of their losses equals
+        the loss of the whole batches. Weights are proportional to the number of samples, which is exact for
+        losses averaged over samples. Override this for losses normalized otherwise, e.g. over tokens.
+        '''
+        batch_size = get_batch_size(batches)
+        return [
+            (micro_batches, get_batch_size(micro_batches) / batch_size)
+            for micro_batches in split_batches(batches, num_splits)
+        ]
+    
+    
+    def convert_memory_format(self, batches: tuple) -> tuple:
+        '''
+        Convert image batches to the memory format of models before computing losses. Tensors created
+        from them with `*_like` functions, e.g. noise, keep the memory format.
+        '''
+        if self.memory_format is None:
+            return batches
+        return to_memory_format(batches, self.memory_format)
+    
+    
+    def compute_eval_metrics(self) -> dict[str, Tensor]:
+        # metrics of the evaluation batches in `self.ctx.batches`, means over the batch or per-sample values, averaged over samples by `EvaluationHook`
+        return {'loss': self.compute_loss()}
+    
+    
     def get_hook(self, hook_type):
         # get hook of specific type
         for hook in self.hooks:
@@ -115,6 +331,215 @@ class Trainer:
         return None
 
 
+    def _pin_cpu_threads(self, accelerator: Accelerator, data_loaders: list[DataLoader]) -> dict[str, list[int]]:
+        '''
+        Intra-op threads of every process are pinned to its own cores, so that processes do not oversubscribe
+        them. Data loader workers are capped to the spare cores and pinned to one core each, or share the
+        compute cores if there are no spare ones.
+        '''
+        num_workers = max((data_loader.num_workers for data_loader in data_loaders), default=0)
+        compute_cores, worker_cores = split_cores(
+            cores=get_available_cores(),
+            local_rank=accelerator.local_process_index,
+            num_local_processes=int(os.environ.get('LOCAL_WORLD_SIZE', accelerator.num_processes)),
+            num_workers=num_workers,
+        )
+        pin_threads(compute_cores)
+        if num_workers == 0:
+            return {'compute': compute_cores, 'workers': []}
+        worker_cores = worker_cores if len(worker_cores) > 0 else compute_cores
+        for data_loader in data_loaders:
+            if data_loader.num_workers > 0:
+                data_loader.num_workers = min(data_loader.num_workers, len(worker_cores))
+                data_loader.worker_init_fn = PinnedWorkerInit(worker_cores, data_loader.worker_init_fn)
+        return {'compute': compute_cores, 'workers': worker_cores}
+    
+    
+    def _clip_grad_norm(self) -> None:
+        '''
+        Accelerate unscales mixed precision gradients, and handles sharded parameters of FSDP and DeepSpeed.
+        Otherwise, the norm is computed with fused multi-tensor kernels by PyTorch and clipping never
+        synchronizes with the host, so the norm stays on device until the metrics registry is read.
+        '''
+        params = [p for model in self.models for p in model.parameters()]
+        grad_norm = self.accelerator.clip_grad_norm_(params, self.max_grad_norm)
+        # DeepSpeed reports the norm of its last step, which is unknown before the first one
+        if grad_norm is not None:
+            self.metrics.push('grad_norm', grad_norm)
+    
+    
+    def _select_samples(self, batches: tuple) -> tuple:
+        '''
+        Cheap forward pass without gradients and in evaluation mode, so that normalization statistics are untouched.
+        Compiled models would be recompiled for it, so the models they wrap are run instead. Modes of all modules
+        are restored afterwards, e.g. of normalization layers frozen in evaluation mode.
+        '''
+        models = self.models
+        self.models = [getattr(model, '_orig_mod', model) for model in models]
+        modes = [(module, module.training) for model in self.models for module in model.modules()]
+        for model in self.models:
+            model.eval()
+        try:
+            with torch.no_grad(), self.accelerator.autocast():
+                losses = self.compute_per_sample_loss().detach().float()
+        finally:
+            for module, is_training in modes:
+                module.training = is_training
+            self.models = models
+        num_selected = max(1, round(self.selective_backprop_ratio * losses.size(0)))
+        if self.selective_backprop_strategy == 'top_k':
+            indices = losses.topk(num_selected).indices
+        else:
+            indices = torch.multinomial(losses.clamp(min=0) + 1e-8, num_selected, replacement=False)
+        self.metrics.push('selection_ratio', num_selected / losses.size(0))
+        self.metrics.push('candidate_loss', losses.mean())
+        self.metrics.push('selected_loss', losses[indices].mean())
+        return select_batches(batches, indices)
+    
+    
+    def _run_forward_backward(self) -> Tensor:
+        '''
+        Batches that run out of memory are re-run as micro-batches with accumulated gradients, and the number
+        of splits is doubled until they fit. It is remembered per batch shapes, so later batches of the same
+        shapes are split right away, while batches that fit are never split.
+        '''
+        batches = self.ctx.batches
+        batch_shapes = get_batch_shapes(batches)
+        batch_size = get_batch_size(batches)
+        num_splits = self.oom_num_splits.get(batch_shapes, 1)
+        while True:
+            self._is_backward_started = False
+            try:
+                return self._run_micro_batches(num_splits)
+            except torch.cuda.OutOfMemoryError:
+                self.ctx.batches = batches
+                '''
+                Partial gradients cannot be separated from those of previous micro-steps in the accumulation. With
+                several processes, a started backward pass may be synchronizing gradients with the other processes,
+                which do not retry it, so it cannot be retried alone.
+                '''
+                is_first_micro_step = self.ctx.batches_idx % self.accelerator.gradient_accumulation_steps == 0
+                is_recoverable = not self._is_backward_started or (is_first_micro_step and self.accelerator.num_processes == 1)
+                if not self.split_batches_on_oom or num_splits >= batch_size or not is_recoverable:
+                    raise
+            # memory of the failed attempt is freed once the traceback is released
+            for model in self.models:
+                model.zero_grad(set_to_none=True)
+            gc.collect()
+            if self.accelerator.device.type == 'cuda':
+                torch.cuda.empty_cache()
+            num_splits = min(num_splits * 2, batch_size)
+            self.oom_num_splits[batch_shapes] = num_splits
+            self.oom_events.append((self.ctx.global_step, batch_shapes, num_splits))
+    
+    
+    def _run_micro_batches(self, num_splits: int) -> Tensor:
+        batches = self.ctx.batches
+        micro_batches_and_weights = [(batches, 1.0)] if num_splits == 1 else self.get_micro_batches(batches, num_splits)
+        # at least one backward pass is needed to synchronize gradients with the other processes
+        assert len(micro_batches_and_weights) > 0, 'No micro-batches to run.'
+        total_loss = 0
+        for idx, (micro_batches, weight) in enumerate(micro_batches_and_weights):
+            self.ctx.batches = micro_batches
+            # forward pass with mixed precision
+            with self.timer.record('compute_loss', on_device=True), self.accelerator.autocast():
+                loss = self.compute_loss()
+            # backward pass to compute gradients, only the last micro-batch synchronizes them across processes
+            self._is_backward_started = True
+            with self.timer.record('backward', on_device=True), ExitStack() as stack:
+                if idx < len(micro_batches_and_weights) - 1:
+                    for model in self.models:
+                        stack.enter_context(self.accelerator.no_sync(model))
+                self.accelerator.backward(loss if num_splits == 1 else loss * weight)
+            total_loss = loss if num_splits == 1 else total_loss + loss.detach() * weight
+        self.ctx.batches = batches
+        return total_loss
+
+
+    def _compile_models(self) -> None:
+        # uncompiled models stay available in `self.originals.models` for inference in hooks
+        self.models = [
+            torch.compile(
+                model, 
+                mode=self.compile_mode, 
+                dynamic=self.compile_dynamic, 
+                backend=self.compile_backend,
+            )
+            for model in self.models
+        ]
+        self.compile_time = None
+    
+    
+    def _run_compile_warmup_step(self) -> None:
+        # compilation is triggered lazily by the first step, so time it apart from regular steps
+        start_time = perf_counter()
+        self.ctx.step_loss = self.training_step()
+        if self.accelerator.device.type == 'cuda':
+            torch.cuda.synchronize(self.accelerator.device)
+        self.compile_time = perf_counter() - start_time
+    
+    
+    @contextmanager
+    def _catch_preemption_signals(self) -> Iterator[None]:
+        # signal handlers can only be installed from the main thread
+        if current_thread() is not main_thread():
+            yield
+            return
+        self.received_signal = None
+        previous_handlers = {
+            signum: signal.signal(signum, self._handle_preemption_signal) 
+            for signum in self.preemption_signals
+        }
+        try:
+            yield
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+    
+    
+    def _handle_preemption_signal(self, signum: int, frame) -> None:
+        # only record the signal, the current optimizer step is finished before exiting
+        self.received_signal = signum
+    
+    
+    def _is_preempted(self) -> bool:
+        if len(self.preemption_signals) == 0:
+            return False
+        is_preempted = self.received_signal is not None
+        if self.accelerator.num_processes == 1:
+            return is_preempted
+        if self.ctx.sync_step % self.preemption_check_interval != 0:
+            return False
+        # all processes must agree to stop at the same step, even if only some of them received the signal
+        flag = torch.tensor(float(is_preempted), device=self.accelerator.device)
+        return self.accelerator.reduce(flag, reduction='sum').item() > 0
+    
+    
+    def _exit_on_preemption(self) -> None:
+        # `CheckpointHook` saves the state on this event
+        self._call_hooks('on_preemption')
+        sys.exit(self.preemption_exit_code)
+    
+    
+    def _call_hooks(self, event: str) -> None:
+        for hook in self.hooks:
+            if event not in _STEP_EVENTS:
+                getattr(hook, event)()
+                continue
+            with self.timer.record(f'{hook.__class__.__name__}.{event}'):
+                getattr(hook, event)()
+    
+    
+    def _iterate_with_timing(self, iterable: Iterable) -> Iterator:
+        iterator = iter(iterable)
+        while True:
+            with self.timer.record('data_wait'):
+                batches = next(iterator, _END_OF_ITERATION)
+            if batches is _END_OF_ITERATION:
+                return
+            yield batches
+
+
     def _set_global_step(self) -> int:
         epoch = self.ctx.epoch
         num_steps_per_epoch = self.ctx.num_steps_per_epoch
@@ -122,6 +547,15 @@ class Trainer:
         self.ctx.global_step = epoch * num_steps_per_epoch + batches_idx
     
     
+    def _set_gradient_accumulation_step(self) -> None:
+        # `accelerator.accumulate` increments the step and syncs gradients when it is divisible
+        num_accumulation_steps = self.accelerator.gradient_accumulation_steps
+        if self.ctx.batches_idx == self.ctx.num_steps_per_epoch - 1:
+            self.accelerator.step = num_accumulation_steps - 1
+        else:
+            self.accelerator.step = self.ctx.batches_idx % num_accumulation_steps
+    
+    
     def __repr__(self) -> str:
         result = f'{self.__class__.__name__}(\n'
         for hook in self.hooks:
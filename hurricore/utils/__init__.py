@@ -2,7 +2,16 @@ from hurricore.utils.config_base import ConfigBase  # noqa: F401
 from hurricore.utils.context import Context  # noqa: F401
 from hurricore.utils.dummy_object import DummyObject  # noqa: F401
 from hurricore.utils.logger import Logger  # noqa: F401
+from hurricore.utils.step_timer import StepTimer  # noqa: F401
+from hurricore.utils.batch_prefetcher import BatchPrefetcher  # noqa: F401
+from hurricore.utils.multi_loader_iterator import MultiLoaderIterator  # noqa: F401
+from hurricore.utils.metrics_registry import MetricsRegistry  # noqa: F401
+from hurricore.utils.resource_monitor import ResourceMonitor  # noqa: F401
 from hurricore.utils.config_utils import *  # noqa: F403
 from hurricore.utils.easy_ops import *  # noqa: F403
 from hurricore.utils.misc import *  # noqa: F403
+from hurricore.utils.activation_checkpointing import *  # noqa: F403
+from hurricore.utils.causal_lm_loss import *  # noqa: F403
+from hurricore.utils.batch_splitting import *  # noqa: F403
+from hurricore.utils.cpu_threads import *  # noqa: F403
 from hurricore.utils.collators import *  # noqa: F403
\ No newline at end of file
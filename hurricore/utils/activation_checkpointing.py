@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from types import MethodType
+from typing import Any, Callable
+
+import torch
+from torch import nn
+from torch.utils.checkpoint import checkpoint
+
+
+def _default_policy(name: str, module: nn.Module, parent: nn.Module) -> bool:
+    # blocks of a stack, e.g. transformer layers or UNet down / up blocks
+    return isinstance(parent, nn.ModuleList) and any(True for _ in module.parameters())
+
+
+def _is_selected(
+    policy: list[str | type] | Callable[[str, nn.Module], bool], 
+    name: str, 
+    module: nn.Module, 
+    parent: nn.Module,
+) -> bool:
+    if policy is None:
+        return _default_policy(name, module, parent)
+    if callable(policy):
+        return policy(name, module)
+    return any(
+        type(module).__name__ == block_type if isinstance(block_type, str) else isinstance(module, block_type)
+        for block_type in policy
+    )
+
+
+def select_checkpoint_blocks(
+    model: nn.Module, 
+    policy: list[str | type] | Callable[[str, nn.Module], bool] = None,
+) -> list[nn.Module]:
+    blocks = []
+
+    def visit(module: nn.Module, prefix: str) -> None:
+        for child_name, child in module.named_children():
+            name = f'{prefix}.{child_name}' if prefix else child_name
+            if _is_selected(policy, name, child, module):
+                # nested blocks are covered by the outer checkpoint
+                blocks.append(child)
+            else:
+                visit(child, name)
+
+    visit(model, '')
+    return blocks
+
+
+def _get_tensor_storages(data: Any) -> set[int]:
+    if isinstance(data, torch.Tensor):
+        return {data.untyped_storage().data_ptr()}
+    storages = set()
+    if isinstance(data, (list, tuple)):
+        for item in data:
+            storages |= _get_tensor_storages(item)
+    elif isinstance(data, dict):
+        for item in data.values():
+            storages |= _get_tensor_storages(item)
+    return storages
+
+
+def _measure_saved_activations(module: nn.Module, forward: Callable, args: tuple, kwargs: dict) -> int:
+    '''
+    Run the block once without checkpointing and count the bytes autograd would keep for backward.
+    Saved tensors are dropped right away, so only one block's activations are alive at a time.
+    Parameters and block inputs are excluded since they are kept in memory anyway.
+    '''
+    excluded_storages = _get_tensor_storages(list(module.parameters())) | _get_tensor_storages((args, kwargs))
+    counted_storages = set()
+    num_bytes = 0
+
+    def pack(tensor: torch.Tensor) -> None:
+        nonlocal num_bytes
+        storage = tensor.untyped_storage()
+        if storage.data_ptr() not in excluded_storages and storage.data_ptr() not in counted_storages:
+            counted_storages.add(storage.data_ptr())
+            num_bytes += storage.nbytes()
+        return None
+
+    devices = [torch.cuda.current_device()] if torch.cuda.is_available() else []
+    with torch.random.fork_rng(devices=devices), torch.autograd.graph.saved_tensors_hooks(pack, lambda _: None):
+        forward(*args, **kwargs)
+    return num_bytes
+
+
+def _wrapped_block_forward(module: nn.Module, *args, **kwargs):
+    unwrapped_forward = module.unwrapped_forward
+    if not (module.training and torch.is_grad_enabled()):
+        return unwrapped_forward(*args, **kwargs)
+    if module.saved_activation_bytes is None:
+        module.saved_activation_bytes = _measure_saved_activations(module, unwrapped_forward, args, kwargs)
+    if module.is_forward_checkpointed:
+        return checkpoint(unwrapped_forward, *args, use_reentrant=False, **kwargs)
+    return unwrapped_forward(*args, **kwargs)
+
+
+def _wrap_block_forward(module: nn.Module, use_checkpoint: bool) -> None:
+    module.unwrapped_forward = module.forward
+    module.is_forward_checkpointed = use_checkpoint
+    module.saved_activation_bytes = None
+    # bound methods are rebound to copies of the module, e.g. by `copy.deepcopy`
+    module.forward = MethodType(_wrapped_block_forward, module)
+
+
+def apply_activation_checkpointing(
+    model: nn.Module, 
+    policy: list[str | type] | Callable[[str, nn.Module], bool] = None,
+) -> list[nn.Module]:
+    '''
+    Recompute activations of selected blocks in backward instead of keeping them.
+    Models with a native API (Hugging Face `gradient_checkpointing_enable`) use it when no policy is given,
+    other models get their blocks wrapped with `torch.utils.checkpoint`.
+    Returns the checkpointed blocks, whose `saved_activation_bytes` is measured on the first training forward.
+    '''
+    blocks = select_checkpoint_blocks(model, policy)
+    if len(blocks) == 0:
+        return blocks
+    use_native_api = policy is None and hasattr(model, 'gradient_checkpointing_enable')
+    if use_native_api:
+        model.gradient_checkpointing_enable(gradient_checkpointing_kwargs={'use_reentrant': False})
+    for block in blocks:
+        # blocks checkpointed by the native API are only wrapped for measurement
+        _wrap_block_forward(block, use_checkpoint=not use_native_api)
+    return blocks
+
+
+def get_saved_activation_memory(blocks: list[nn.Module]) -> int:
+    # activation bytes per micro-batch no longer kept for backward, None before the first training forward
+    measured_bytes = [block.saved_activation_bytes for block in blocks if block.saved_activation_bytes is not None]
+    if len(measured_bytes) == 0:
+        return None
+    return sum(measured_bytes)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from queue import Queue, Full
+from threading import Thread, Event
+from typing import Any, Iterable, Iterator
+
+import torch
+from torch.utils.data import DataLoader
+from accelerate.utils import synchronize_rng_states
+
+
+_END_OF_ITERATION = object()
+
+
+class _ExceptionWrapper:
+    def __init__(self, exception: BaseException) -> None:
+        self.exception = exception
+
+
+def _record_stream(data: Any, stream: torch.cuda.Stream) -> None:
+    if isinstance(data, torch.Tensor):
+        if data.is_cuda:
+            data.record_stream(stream)
+    elif isinstance(data, (list, tuple)):
+        for item in data:
+            _record_stream(item, stream)
+    elif isinstance(data, dict):
+        for item in data.values():
+            _record_stream(item, stream)
+
+
+class BatchPrefetcher:
+    def __init__(
+        self,
+        iterable: Iterable,
+        data_loaders: list[DataLoader],
+        size: int = 2,
+        device: torch.device = None,
+    ) -> None:
+        assert size > 0, 'Prefetch size must be greater than 0.'
+        self.iterable = iterable
+        self.data_loaders = data_loaders
+        self.size = size
+        self.device = torch.device('cpu') if device is None else torch.device(device)
+        # device copies are issued on a side stream so that they overlap with compute
+        self.stream = torch.cuda.Stream(self.device) if self.device.type == 'cuda' else None
+
+
+    def __iter__(self) -> Iterator:
+        '''
+        Accelerate synchronizes the RNG states of prepared dataloaders with a collective
+        when their iteration starts. Collectives must not be issued from the background
+        thread, so the states are synchronized here once and disabled while prefetching.
+        '''
+        rng_types = [getattr(dl, 'rng_types', None) for dl in self.data_loaders]
+        for dl, dl_rng_types in zip(self.data_loaders, rng_types):
+            if dl_rng_types is not None:
+                synchronize_rng_states(dl_rng_types, dl.synchronized_generator)
+                dl.rng_types = None
+        buffer = Queue(maxsize=self.size)
+        stop_event = Event()
+        Thread(target=self._produce, args=(buffer, stop_event), daemon=True).start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is _END_OF_ITERATION:
+                    return
+                if isinstance(item, _ExceptionWrapper):
+                    raise item.exception
+                batches, ready_event = item
+                if ready_event is not None:
+                    current_stream = torch.cuda.current_stream(self.device)
+                    current_stream.wait_event(ready_event)
+                    _record_stream(batches, current_stream)
+                yield batches
+        finally:
+            stop_event.set()
+            for dl, dl_rng_types in zip(self.data_loaders, rng_types):
+                if dl_rng_types is not None:
+                    dl.rng_types = dl_rng_types
+
+
+    def _produce(self, buffer: Queue, stop_event: Event) -> None:
+        try:
+            if self.stream is not None:
+                torch.cuda.set_device(self.device)
+            iterator = iter(self.iterable)
+            while not stop_event.is_set():
+                ready_event = None
+                if self.stream is not None:
+                    with torch.cuda.stream(self.stream):
+                        batches = next(iterator, _END_OF_ITERATION)
+                        ready_event = torch.cuda.Event()
+                        ready_event.record(self.stream)
+                else:
+                    batches = next(iterator, _END_OF_ITERATION)
+                if batches is _END_OF_ITERATION:
+                    self._put(buffer, stop_event, _END_OF_ITERATION)
+                    return
+                self._put(buffer, stop_event, (batches, ready_event))
+        except Exception as e:
+            self._put(buffer, stop_event, _ExceptionWrapper(e))
+
+
+    @staticmethod
+    def _put(buffer: Queue, stop_event: Event, item: Any) -> None:
+        # bounded queue provides backpressure, but never block after the consumer quits
+        while not stop_event.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return
+            except Full:
+                continue
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import Any
+
+import torch
+
+
+def get_batch_shapes(batches: Any) -> tuple:
+    # shapes of all tensors in nested lists, tuples and dicts of batches
+    if isinstance(batches, torch.Tensor):
+        return tuple(batches.shape)
+    if isinstance(batches, (list, tuple)):
+        return tuple(get_batch_shapes(item) for item in batches)
+    if isinstance(batches, dict):
+        return tuple((key, get_batch_shapes(value)) for key, value in batches.items())
+    return ()
+
+
+def get_batch_size(batches: Any) -> int:
+    # size of the first dimension of the first tensor found
+    if isinstance(batches, torch.Tensor):
+        return batches.size(0)
+    items = batches.values() if isinstance(batches, dict) else batches if isinstance(batches, (list, tuple)) else []
+    for item in items:
+        batch_size = get_batch_size(item)
+        if batch_size is not None:
+            return batch_size
+    return None
+
+
+def split_batches(batches: Any, num_splits: int) -> list:
+    '''
+    Split every tensor in nested lists, tuples and dicts along the first dimension into `num_splits`
+    parts of nearly equal size, and return `num_splits` batches of the same structure.
+    Non-tensor items are shared by all parts.
+    '''
+    if isinstance(batches, torch.Tensor):
+        return list(batches.tensor_split(num_splits))
+    if isinstance(batches, (list, tuple)):
+        splits = [split_batches(item, num_splits) for item in batches]
+        return [type(batches)(parts) for parts in zip(*splits)] if len(batches) > 0 else [batches] * num_splits
+    if isinstance(batches, dict):
+        splits = {key: split_batches(value, num_splits) for key, value in batches.items()}
+        return [{key: parts[idx] for key, parts in splits.items()} for idx in range(num_splits)]
+    return [batches] * num_splits
+
+
+def select_batches(batches: Any, indices: torch.Tensor) -> Any:
+    # select samples of every tensor in nested lists, tuples and dicts along the first dimension
+    if isinstance(batches, torch.Tensor):
+        return batches[indices.to(batches.device)]
+    if isinstance(batches, (list, tuple)):
+        return type(batches)(select_batches(item, indices) for item in batches)
+    if isinstance(batches, dict):
+        return {key: select_batches(value, indices) for key, value in batches.items()}
+    return batches
+
+
+def to_memory_format(batches: Any, memory_format: torch.memory_format) -> Any:
+    # convert every floating point tensor in nested lists, tuples and dicts whose rank matches the memory format
+    if isinstance(batches, torch.Tensor):
+        rank = {torch.channels_last: 4, torch.channels_last_3d: 5}.get(memory_format)
+        if batches.is_floating_point() and (rank is None or batches.dim() == rank):
+            return batches.contiguous(memory_format=memory_format)
+        return batches
+    if isinstance(batches, (list, tuple)):
+        return type(batches)(to_memory_format(item, memory_format) for item in batches)
+    if isinstance(batches, dict):
+        return {key: to_memory_format(value, memory_format) for key, value in batches.items()}
+    return batches
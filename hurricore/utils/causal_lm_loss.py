@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from typing import Callable
+
+import torch
+from torch.nn import functional as F
+from torch.utils.checkpoint import checkpoint
+
+
+def _compute_chunk_loss_sum(
+    lm_head: Callable[[torch.Tensor], torch.Tensor],
+    hidden_states: torch.Tensor,
+    labels: torch.Tensor,
+    ignore_index: int,
+) -> torch.Tensor:
+    # upcast logits as Hugging Face models do for numerical stability
+    logits = lm_head(hidden_states).float()
+    return F.cross_entropy(logits, labels, ignore_index=ignore_index, reduction='sum')
+
+
+def compute_causal_lm_loss(
+    hidden_states: torch.Tensor,
+    labels: torch.Tensor,
+    lm_head: Callable[[torch.Tensor], torch.Tensor],
+    chunk_size: int = None,
+    skip_ignored_labels: bool = False,
+    ignore_index: int = -100,
+) -> torch.Tensor:
+    '''
+    Next token cross-entropy from the final hidden states, same as `model(..., labels=labels).loss`.
+    With `chunk_size`, the LM head and cross-entropy run on chunks of tokens and are recomputed in backward,
+    so logits of at most `chunk_size` tokens exist at a time instead of [batch, seq, vocab].
+    With `skip_ignored_labels`, hidden states of prompt and padding positions are dropped before the LM head.
+    Dropping them is a boolean mask indexing, whose output size depends on the labels, so it synchronizes the
+    host with the device and breaks compiled graphs. Otherwise, all shapes are static and nothing is synchronized.
+    '''
+    assert chunk_size is None or chunk_size > 0, 'Chunk size must be greater than 0.'
+    # tokens < n predict n
+    hidden_states = hidden_states[:, :-1].reshape(-1, hidden_states.size(-1))
+    labels = labels[:, 1:].reshape(-1).to(hidden_states.device)
+    is_valid_label = labels != ignore_index
+    num_valid_labels = is_valid_label.sum()
+    if skip_ignored_labels:
+        hidden_states = hidden_states[is_valid_label]
+        labels = labels[is_valid_label]
+    if chunk_size is None:
+        loss_sum = _compute_chunk_loss_sum(lm_head, hidden_states, labels, ignore_index)
+    else:
+        loss_sum = sum(
+            checkpoint(
+                _compute_chunk_loss_sum,
+                lm_head,
+                hidden_states[start:start + chunk_size],
+                labels[start:start + chunk_size],
+                ignore_index,
+                use_reentrant=False,
+            )
+            for start in range(0, labels.size(0), chunk_size)
+        )
+    return loss_sum / num_valid_labels
+
+
+def compute_per_sample_causal_lm_loss(
+    hidden_states: torch.Tensor,
+    labels: torch.Tensor,
+    lm_head: Callable[[torch.Tensor], torch.Tensor],
+    chunk_size: int = None,
+    skip_ignored_labels: bool = False,
+    ignore_index: int = -100,
+) -> torch.Tensor:
+    '''
+    Next token cross-entropy averaged over the valid labels of every sample, of shape [batch].
+    The LM head runs in chunks of at most `chunk_size` tokens. With `skip_ignored_labels`, only positions 
+    with valid labels go through the LM head, at the cost of a host-device synchronization as in `compute_causal_lm_loss`.
+    Samples without valid labels get a loss of 0.
+    '''
+    assert chunk_size is None or chunk_size > 0, 'Chunk size must be greater than 0.'
+    batch_size, seq_len = labels.shape
+    hidden_states = hidden_states[:, :-1].reshape(-1, hidden_states.size(-1))
+    labels = labels[:, 1:].reshape(-1).to(hidden_states.device)
+    sample_indices = torch.arange(batch_size, device=hidden_states.device).repeat_interleave(seq_len - 1)
+    if skip_ignored_labels:
+        is_valid_label = labels != ignore_index
+        hidden_states = hidden_states[is_valid_label]
+        labels = labels[is_valid_label]
+        sample_indices = sample_indices[is_valid_label]
+    chunk_size = max(labels.size(0), 1) if chunk_size is None else chunk_size
+    # losses of ignored labels are 0
+    token_losses = [
+        F.cross_entropy(
+            lm_head(hidden_states[start:start + chunk_size]).float(), 
+            labels[start:start + chunk_size], 
+            ignore_index=ignore_index, 
+            reduction='none',
+        )
+        for start in range(0, labels.size(0), chunk_size)
+    ]
+    token_losses = torch.cat(token_losses) if len(token_losses) > 0 else hidden_states.new_zeros(0, dtype=torch.float)
+    loss_sums = token_losses.new_zeros(batch_size).index_add_(0, sample_indices, token_losses)
+    num_valid_labels = token_losses.new_zeros(batch_size).index_add_(0, sample_indices, (labels != ignore_index).float())
+    return loss_sums / num_valid_labels.clamp(min=1)
@@ -1,15 +1,29 @@
 class Context:
-    def __init__(self, **kwargs) -> None:
+    '''
+    Attributes shared by a trainer and its hooks. Only attributes declared persistent, such as
+    counters and cursors, are saved in and restored from checkpoints. The others, such as the
+    current batches or losses, are transient and never serialized.
+    '''
+    def __init__(self, persistent_keys: list[str] = None, **kwargs) -> None:
+        self._persistent_keys = []
+        if persistent_keys is not None:
+            self.persist(*persistent_keys)
         for key, value in kwargs.items():
             setattr(self, key, value)
 
     def __repr__(self) -> str:
-        attributes = ', '.join(f"{key}={value}" for key, value in vars(self).items())
+        attributes = ', '.join(f"{key}={value}" for key, value in vars(self).items() if key != '_persistent_keys')
         return f"Context({attributes})"
 
+    def persist(self, *keys: str) -> None:
+        # declare attributes to be checkpointed
+        self._persistent_keys.extend(key for key in keys if key not in self._persistent_keys)
+
     def state_dict(self) -> dict:
-        return vars(self)
+        return {key: getattr(self, key) for key in self._persistent_keys if hasattr(self, key)}
 
     def load_state_dict(self, state_dict: dict) -> None:
+        # transient attributes of checkpoints written before they were separated are ignored
         for key, value in state_dict.items():
-            setattr(self, key, value)
+            if key in self._persistent_keys:
+                setattr(self, key, value)
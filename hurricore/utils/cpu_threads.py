@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import os
+from typing import Callable
+
+import torch
+
+
+def get_available_cores() -> list[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+
+def split_cores(
+    cores: list[int],
+    local_rank: int,
+    num_local_processes: int,
+    num_workers: int,
+) -> tuple[list[int], list[int]]:
+    '''
+    Divide `cores` evenly between the processes of a node, and the cores of a process between its compute
+    threads and up to `num_workers` data loader workers, keeping at least half of them for compute threads.
+    Return the compute cores and the worker cores of the process.
+    '''
+    num_cores_per_process = max(1, len(cores) // num_local_processes)
+    start = local_rank * num_cores_per_process % len(cores)
+    process_cores = cores[start:start + num_cores_per_process]
+    num_worker_cores = min(num_workers, len(process_cores) // 2)
+    num_compute_cores = len(process_cores) - num_worker_cores
+    return process_cores[:num_compute_cores], process_cores[num_compute_cores:]
+
+
+def pin_threads(cores: list[int], num_interop_threads: int = 1) -> None:
+    # pin the calling thread and threads created by it to `cores`, with one intra-op thread per core
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    try:
+        torch.set_num_interop_threads(num_interop_threads)
+    except RuntimeError:
+        # can only be set once, before any inter-op parallel work has started
+        pass
+
+
+def is_cpu_bf16_supported() -> bool:
+    return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+
+
+class PinnedWorkerInit:
+    # picklable `worker_init_fn` that pins every data loader worker to a single core of `cores`
+    def __init__(self, cores: list[int], worker_init_fn: Callable[[int], None] = None) -> None:
+        self.cores = cores
+        self.worker_init_fn = worker_init_fn
+
+
+    def __call__(self, worker_id: int) -> None:
+        pin_threads([self.cores[worker_id % len(self.cores)]])
+        if self.worker_init_fn is not None:
+            self.worker_init_fn(worker_id)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import torch
+from accelerate import Accelerator
+
+
+class MetricsRegistry:
+    '''
+    Named scalars pushed by the trainer and hooks during an epoch.
+    Values are accumulated on device and all-reduced in one flattened collective at each sync point.
+    The synchronized totals are cached until new values are pushed, so every reader of the same step
+    shares one collective and one device-to-host copy.
+    '''
+
+    reductions = ('mean', 'sum')
+
+    def __init__(self, accelerator: Accelerator) -> None:
+        self.accelerator = accelerator
+        self.num_syncs = 0
+        self.reset()
+
+
+    def reset(self) -> None:
+        # called at the start of every epoch
+        self.metric_reductions = {}
+        self._sums = {}
+        self._counts = {}
+        self._version = 0
+        self._synced_version = None
+        self._synced_totals = {}
+        self._read_totals = {}
+
+
+    def push(self, name: str, value: torch.Tensor | float, reduction: str = 'mean') -> None:
+        '''
+        `mean` metrics are averaged over pushes and processes, `sum` metrics are summed over both.
+        Every process must push the same names in the same order.
+        '''
+        assert reduction in self.reductions, f'Invalid reduction: {reduction}.'
+        assert self.metric_reductions.get(name, reduction) == reduction, f'Inconsistent reduction of {name}.'
+        # double precision keeps large cumulative counts such as tokens or FLOPs exact enough
+        value = torch.as_tensor(value).detach().double().to(self.accelerator.device, non_blocking=True).mean()
+        self.metric_reductions[name] = reduction
+        self._sums[name] = self._sums[name] + value if name in self._sums else value
+        self._counts[name] = self._counts.get(name, 0) + 1
+        self._version += 1
+
+
+    def sync(self) -> dict[str, tuple[float, int]]:
+        # must be called by all processes at the same points
+        if self._synced_version == self._version:
+            return self._synced_totals
+        names = list(self._sums.keys())
+        if len(names) > 0:
+            sums = torch.stack([self._sums[name] for name in names])
+            sums = self.accelerator.reduce(sums, reduction='sum').tolist()
+            self.num_syncs += 1
+        else:
+            sums = []
+        self._synced_totals = {name: (total, self._counts[name]) for name, total in zip(names, sums)}
+        self._synced_version = self._version
+        return self._synced_totals
+
+
+    def read(self, reader: str) -> dict[str, float]:
+        # values pushed since the last read of `reader`
+        totals = self.sync()
+        previous_totals = self._read_totals.get(reader, {})
+        self._read_totals[reader] = totals
+        return self._compute_values(totals, previous_totals)
+
+
+    def read_epoch(self) -> dict[str, float]:
+        # values pushed since the start of the epoch
+        return self._compute_values(self.sync(), {})
+
+
+    def _compute_values(
+        self,
+        totals: dict[str, tuple[float, int]],
+        previous_totals: dict[str, tuple[float, int]],
+    ) -> dict[str, float]:
+        values = {}
+        for name, (total, count) in totals.items():
+            previous_total, previous_count = previous_totals.get(name, (0.0, 0))
+            if count == previous_count:
+                continue
+            if self.metric_reductions[name] == 'mean':
+                values[name] = (total - previous_total) / (count - previous_count) / self.accelerator.num_processes
+            else:
+                values[name] = total - previous_total
+        return values
@@ -1,14 +1,48 @@
 from __future__ import annotations
 
+import logging
+import os
 from pathlib import Path
 from datetime import datetime
-from typing import Iterable
+from typing import Callable, Iterable
 
 import torch
 from accelerate import notebook_launcher
-
-
-launch = notebook_launcher
+from accelerate.utils import patch_environment
+
+from hurricore.utils.cpu_threads import get_available_cores, is_cpu_bf16_supported
+
+
+_logger = logging.getLogger(__name__)
+
+
+def launch(
+    function: Callable, 
+    args: tuple = (), 
+    num_processes: int = None, 
+    mixed_precision: str = None, 
+    cpu_bf16: bool = False,
+    **kwargs,
+) -> None:
+    '''
+    `accelerate.notebook_launcher` with a CPU mode. Without GPUs, OpenMP runtimes of every process are limited
+    to its share of cores, and with `cpu_bf16`, bf16 autocast is enabled where supported unless `mixed_precision`
+    is given. Accelerators read the mixed precision from the environment when it is not passed to them explicitly.
+    '''
+    environment = {}
+    if not torch.cuda.is_available():
+        if 'OMP_NUM_THREADS' not in os.environ:
+            environment['omp_num_threads'] = max(1, len(get_available_cores()) // (num_processes or 1))
+        if cpu_bf16 and mixed_precision is None:
+            if is_cpu_bf16_supported():
+                mixed_precision = 'bf16'
+                _logger.info('No GPUs are available, training on CPU with bf16 autocast.')
+            else:
+                _logger.warning('No GPUs are available and the CPU does not support bf16, training on CPU in full precision.')
+        if mixed_precision is not None:
+            environment['accelerate_mixed_precision'] = mixed_precision
+    with patch_environment(**environment):
+        notebook_launcher(function, args, num_processes=num_processes, mixed_precision=mixed_precision or 'no', **kwargs)
 
 
 def find_latest_checkpoint(checkpoints_folder_path: Path) -> Path:
@@ -78,3 +112,35 @@ def get_params_details_table(*models: tuple[torch.nn.Module]) -> str:
             table_rows.append(row)
         full_table = '\n'.join(table_rows)
         return f'\n{full_table}\n'
+
+
+def get_num_matmul_params(model: torch.nn.Module, requires_grad: bool = None) -> int:
+    # input embeddings are lookups rather than matmuls, unless they are tied to the output embeddings
+    # with `requires_grad`, only trainable or frozen parameters are counted
+    params = [p for p in model.parameters() if requires_grad is None or p.requires_grad == requires_grad]
+    num_params = sum(p.numel() for p in params)
+    input_weight = model.get_input_embeddings().weight
+    output_embeddings = model.get_output_embeddings()
+    is_input_weight_counted = any(p is input_weight for p in params)
+    if is_input_weight_counted and (output_embeddings is None or output_embeddings.weight is not input_weight):
+        num_params -= input_weight.numel()
+    return num_params
+
+
+def estimate_flops_per_token(
+    num_matmul_params: int, 
+    num_layers: int, 
+    hidden_size: int, 
+    seq_len: int,
+    num_frozen_matmul_params: int = 0,
+    include_backward: bool = True,
+) -> int:
+    '''
+    Forward and backward FLOPs of parameter matmuls plus attention scores, as in the PaLM paper.
+    `num_matmul_params` includes the `num_frozen_matmul_params` frozen ones, e.g. LoRA base weights, which
+    skip the weight gradient but still compute the input gradient, i.e. 4 rather than 6 FLOPs per parameter.
+    Without `include_backward`, only the forward FLOPs are counted, i.e. a third of those of a training step.
+    '''
+    if not include_backward:
+        return 2 * num_matmul_params + 4 * num_layers * hidden_size * seq_len
+    return 6 * num_matmul_params - 2 * num_frozen_matmul_params + 12 * num_layers * hidden_size * seq_len
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import math
+from typing import Iterator
+
+import torch
+from torch.utils.data import DataLoader
+from accelerate import skip_first_batches
+
+
+_END_OF_ITERATION = object()
+
+
+class MultiLoaderIterator:
+
+    strategies = ('zip_longest', 'shortest', 'cycle', 'round_robin', 'weighted')
+
+    def __init__(
+        self,
+        data_loaders: list[DataLoader],
+        strategy: str = 'zip_longest',
+        weights: list[float] = None,
+        seed: int = 42,
+        epoch: int = 0,
+        start_step: int = 0,
+    ) -> None:
+        # check validity
+        assert strategy in self.strategies, f'Invalid iteration strategy: {strategy}.'
+        assert len(data_loaders) > 0, 'At least one dataloader is required.'
+        if strategy == 'weighted':
+            assert weights is not None and len(weights) == len(data_loaders), 'Invalid dataloader weights.'
+            assert all(w >= 0 for w in weights) and sum(weights) > 0, 'Invalid dataloader weights.'
+        # setup self
+        self.data_loaders = data_loaders
+        self.strategy = strategy
+        self.epoch = epoch
+        self.start_step = start_step
+        self.lengths = [len(dl) for dl in data_loaders]
+        self.num_steps = self._compute_num_steps()
+        self.schedule = self._build_schedule(weights, seed)
+        self.max_passes = self._compute_max_passes()
+
+
+    def __len__(self) -> int:
+        return self.num_steps
+
+
+    def __iter__(self) -> Iterator[tuple]:
+        num_draws = self.get_cursors(self.start_step)
+        iterators = [None] * len(self.data_loaders)
+        for step in range(self.start_step, self.num_steps):
+            batches = [None] * len(self.data_loaders)
+            finished_indices = []
+            for idx in self.get_loader_indices(step):
+                if iterators[idx] is None:
+                    iterators[idx] = self._start_pass(idx, num_draws[idx])
+                batches[idx] = next(iterators[idx])
+                num_draws[idx] += 1
+                if num_draws[idx] % self.lengths[idx] == 0:
+                    finished_indices.append(idx)
+            yield tuple(batches)
+            '''
+            Finish the passes so that the dataloaders clean up their states, only once their last batches are
+            consumed, as accelerate syncs gradients at the end of a dataloader while it is still being iterated.
+            '''
+            for idx in finished_indices:
+                next(iterators[idx], _END_OF_ITERATION)
+                iterators[idx] = None
+
+
+    def get_loader_indices(self, step: int) -> list[int]:
+        if self.strategy == 'zip_longest':
+            return [idx for idx, length in enumerate(self.lengths) if step < length]
+        if self.strategy in ('shortest', 'cycle'):
+            return list(range(len(self.data_loaders)))
+        return [self.schedule[step]]
+
+
+    def get_cursors(self, step: int) -> list[int]:
+        # number of batches drawn from each dataloader before `step`
+        if self.strategy == 'zip_longest':
+            return [min(step, length) for length in self.lengths]
+        if self.strategy in ('shortest', 'cycle'):
+            return [step] * len(self.data_loaders)
+        cursors = [0] * len(self.data_loaders)
+        for idx in self.schedule[:step]:
+            cursors[idx] += 1
+        return cursors
+
+
+    def _start_pass(self, idx: int, num_draws: int) -> Iterator:
+        dl = self.data_loaders[idx]
+        pass_idx, skip_batches = divmod(num_draws, self.lengths[idx])
+        # every pass gets a distinct and reproducible epoch for seedable samplers
+        dl.set_epoch(self.epoch * self.max_passes[idx] + pass_idx)
+        if skip_batches > 0:
+            # resume by skipping sampled indices, so that skipped samples are never loaded or collated
+            dl = skip_first_batches(dl, skip_batches)
+        return iter(dl)
+
+
+    def _compute_num_steps(self) -> int:
+        if self.strategy in ('zip_longest', 'cycle'):
+            return max(self.lengths)
+        if self.strategy == 'shortest':
+            return min(self.lengths)
+        return sum(self.lengths)
+
+
+    def _compute_max_passes(self) -> list[int]:
+        if self.strategy in ('cycle', 'weighted'):
+            return [math.ceil(self.num_steps / length) for length in self.lengths]
+        return [1] * len(self.data_loaders)
+
+
+    def _build_schedule(self, weights: list[float], seed: int) -> list[int]:
+        if self.strategy == 'round_robin':
+            schedule = []
+            for step in range(max(self.lengths)):
+                schedule.extend(idx for idx, length in enumerate(self.lengths) if step < length)
+            return schedule
+        if self.strategy == 'weighted':
+            # identical on every process and every resume of the same epoch
+            generator = torch.Generator().manual_seed(seed + self.epoch)
+            return torch.multinomial(
+                torch.tensor(weights, dtype=torch.float),
+                num_samples=self.num_steps,
+                replacement=True,
+                generator=generator,
+            ).tolist()
+        return []
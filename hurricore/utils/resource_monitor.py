@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import os
+import time
+from threading import Thread, Event
+from typing import Callable
+
+import torch
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _read_proc_rss(pid: int) -> int:
+    # resident pages are the second field of statm
+    with open(f'/proc/{pid}/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def _list_proc_children(pid: int) -> list[int]:
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        # the process or one of its threads exited meanwhile
+        pass
+    return children + [grandchild for child in children for grandchild in _list_proc_children(child)]
+
+
+class ResourceMonitor:
+    '''
+    Samples host and device resources in a background thread at its own cadence,
+    so that readers of `snapshot` never query the OS or the GPU driver from the training loop.
+    A sampler is a callable returning a dict of named values; samplers that raise are dropped,
+    which is how unsupported ones, e.g. GPU utilization without NVML, are disabled.
+    '''
+
+    def __init__(
+        self,
+        device: torch.device,
+        interval: float = 5.0,
+    ) -> None:
+        assert interval > 0, 'Resource monitor interval must be greater than 0.'
+        self.device = torch.device(device)
+        self.interval = interval
+        self.samplers = [self._sample_cpu, self._sample_memory]
+        if self.device.type == 'cuda':
+            self.samplers.extend([self._sample_gpu_memory, self._sample_gpu_utilization])
+        self.snapshot = {}
+        self._last_cpu_times = None
+        self._thread = None
+        self._stop_event = None
+
+
+    def add_sampler(self, sampler: Callable[[], dict[str, float]]) -> None:
+        self.samplers.append(sampler)
+
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop_event = Event()
+        self._thread = Thread(target=self._run, args=(self._stop_event, ), daemon=True)
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+
+    def sample(self) -> dict[str, float]:
+        snapshot = {}
+        for sampler in list(self.samplers):
+            try:
+                snapshot.update(sampler())
+            except Exception:
+                self.samplers.remove(sampler)
+        # replaced at once, so readers never see a partial snapshot
+        self.snapshot = snapshot
+        return snapshot
+
+
+    def _run(self, stop_event: Event) -> None:
+        while True:
+            self.sample()
+            if stop_event.wait(self.interval):
+                return
+
+
+    def _sample_cpu(self) -> dict[str, float]:
+        # process CPU time over wall time, exceeds 100% when several cores are busy
+        times = os.times()
+        cpu_times = (times.user + times.system, time.perf_counter())
+        last_cpu_times, self._last_cpu_times = self._last_cpu_times, cpu_times
+        if last_cpu_times is None:
+            return {}
+        return {'cpu_percent': (cpu_times[0] - last_cpu_times[0]) / (cpu_times[1] - last_cpu_times[1]) * 100}
+
+
+    def _sample_memory(self) -> dict[str, float]:
+        # child processes are mostly dataloader workers, their RSS includes pages shared with the main process
+        if psutil is not None:
+            process = psutil.Process()
+            host_rss = process.memory_info().rss
+            worker_rss = 0
+            for child in process.children(recursive=True):
+                try:
+                    worker_rss += child.memory_info().rss
+                except psutil.Error:
+                    continue
+        else:
+            host_rss = _read_proc_rss(os.getpid())
+            worker_rss = 0
+            for child in _list_proc_children(os.getpid()):
+                try:
+                    worker_rss += _read_proc_rss(child)
+                except OSError:
+                    continue
+        return {'host_rss': host_rss, 'worker_rss': worker_rss}
+
+
+    def _sample_gpu_memory(self) -> dict[str, float]:
+        free_memory, total_memory = torch.cuda.mem_get_info(self.device)
+        return {'gpu_memory': total_memory - free_memory}
+
+
+    def _sample_gpu_utilization(self) -> dict[str, float]:
+        return {'gpu_utilization': torch.cuda.utilization(self.device)}
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+import torch
+
+
+class StepTimer:
+    def __init__(
+        self,
+        device: torch.device,
+        momentum: float = 0.9,
+    ) -> None:
+        assert 0 <= momentum < 1, 'Momentum must be in [0, 1).'
+        # device work is asynchronous, so CUDA events are used instead of host clocks for it
+        self.use_cuda_events = torch.device(device).type == 'cuda'
+        self.momentum = momentum
+        self.stats = {}
+        self._pending_events = deque()
+
+
+    @contextmanager
+    def record(self, name: str, on_device: bool = False) -> Iterator[None]:
+        '''
+        Time the enclosed block under `name`. Set `on_device` for blocks that launch device work, which are
+        timed with CUDA events on the stream. Host blocks, e.g. waiting for data or running hooks, are timed
+        with host clocks, since events would also include device work queued before them.
+        '''
+        if self.use_cuda_events and on_device:
+            start_event = torch.cuda.Event(enable_timing=True)
+            end_event = torch.cuda.Event(enable_timing=True)
+            start_event.record()
+            yield
+            end_event.record()
+            self._pending_events.append((name, start_event, end_event))
+        else:
+            start_time = time.perf_counter()
+            yield
+            self._update(name, (time.perf_counter() - start_time) * 1000)
+
+
+    def get_summary(self) -> dict[str, float]:
+        # only resolve events the device has finished, never block the host
+        while len(self._pending_events) > 0 and self._pending_events[0][2].query():
+            name, start_event, end_event = self._pending_events.popleft()
+            self._update(name, start_event.elapsed_time(end_event))
+        return {name: stat['mean'] for name, stat in self.stats.items()}
+
+
+    def _update(self, name: str, elapsed_ms: float) -> None:
+        if name not in self.stats:
+            self.stats[name] = {'mean': elapsed_ms, 'max': elapsed_ms, 'count': 1}
+            return
+        stat = self.stats[name]
+        stat['mean'] = self.momentum * stat['mean'] + (1 - self.momentum) * elapsed_ms
+        stat['max'] = max(stat['max'], elapsed_ms)
+        stat['count'] += 1
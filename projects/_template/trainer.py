@@ -41,6 +41,8 @@ class Trainer(HurricoreTrainer):
         ckpt_folder_path: Path = None,
         ckpt_interval: int = 100,
         ckpt_seed: int = 42,
+        # other trainer options
+        **kwargs,
     ) -> None:
         super().__init__(
             models=[model], 
@@ -48,6 +50,7 @@ class Trainer(HurricoreTrainer):
             optimizers=[optimizer], 
             accelerator=accelerator,
             num_epochs=num_epochs,
+            **kwargs,
         )
         self.hooks = [
             LoggerHook(
@@ -0,0 +1,122 @@
+import copy
+
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from hurricore.trainers import Trainer
+from hurricore.utils import select_checkpoint_blocks, apply_activation_checkpointing
+
+
+class _Block(nn.Module):
+    def __init__(self, dim: int) -> None:
+        super().__init__()
+        self.layers = nn.Sequential(nn.Linear(dim, dim * 4), nn.GELU(), nn.Dropout(0.1), nn.Linear(dim * 4, dim))
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return x + self.layers(x)
+
+
+class _Model(nn.Module):
+    def __init__(self, dim: int = 8, num_blocks: int = 3) -> None:
+        super().__init__()
+        self.blocks = nn.ModuleList([_Block(dim) for _ in range(num_blocks)])
+        self.head = nn.Linear(dim, 1)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        for block in self.blocks:
+            x = block(x)
+        return self.head(x)
+
+
+class _TestTrainer(Trainer):
+    def __init__(self, model: nn.Module, data: torch.Tensor, **kwargs):
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=1e-2)],
+            data_loaders=[DataLoader(data, batch_size=4)],
+            accelerator=Accelerator(),
+            num_epochs=1,
+            **kwargs,
+        )
+        self.step_losses = []
+
+
+    def compute_loss(self) -> torch.Tensor:
+        batch = self.ctx.batches[0]
+        if batch.dtype == torch.long:
+            loss = self.models[0](input_ids=batch, labels=batch, use_cache=False).loss
+        else:
+            loss = self.models[0](batch).mean()
+        self.step_losses.append(loss.item())
+        return loss
+
+
+def _train(model: nn.Module, data: torch.Tensor, **kwargs) -> _TestTrainer:
+    torch.manual_seed(0)
+    trainer = _TestTrainer(model, data, **kwargs)
+    trainer.run()
+    return trainer
+
+
+def test_activation_checkpointing_policies():
+    model = _Model()
+    assert select_checkpoint_blocks(model) == list(model.blocks), "Default policy should select stacked blocks."
+    assert select_checkpoint_blocks(model, ['_Block']) == list(model.blocks), "Class name policy is not applied."
+    assert select_checkpoint_blocks(model, [nn.Linear]) == [block.layers[i] for block in model.blocks for i in (0, 3)] + [model.head], \
+        "Class type policy is not applied."
+    assert select_checkpoint_blocks(model, lambda name, _: name == 'head') == [model.head], "Callable policy is not applied."
+
+
+def test_activation_checkpointing():
+    data = torch.randn(16, 8)
+    torch.manual_seed(0)
+    trainer = _train(_Model(), data)
+    torch.manual_seed(0)
+    checkpointing_trainer = _train(_Model(), data, activation_checkpointing=True)
+    assert len(checkpointing_trainer.checkpointed_blocks) == 3, "Wrong blocks are checkpointed."
+    assert checkpointing_trainer.step_losses == trainer.step_losses, "Checkpointed training does not match the original."
+    assert all(
+        torch.equal(p, q) for p, q in zip(trainer.originals.models[0].parameters(), checkpointing_trainer.originals.models[0].parameters())
+    ), "Checkpointed gradients do not match the original."
+    # hidden activations of the linear layers, the GELU and the dropout mask in every block
+    assert checkpointing_trainer.saved_activation_memory > 3 * 4 * 32 * 4, "Saved activation memory is not measured."
+
+
+def test_activation_checkpointing_deepcopy():
+    model = _Model()
+    apply_activation_checkpointing(model)
+    # copies, e.g. EMA models, run their own blocks, which are identities once their parameters are zeroed
+    copied_model = copy.deepcopy(model)
+    with torch.no_grad():
+        for param in copied_model.blocks.parameters():
+            param.zero_()
+    x = torch.randn(4, 8)
+    with torch.no_grad():
+        assert torch.equal(copied_model.eval()(x), copied_model.head(x)), "Copied blocks run the original blocks."
+    assert torch.equal(copied_model.train()(x), copied_model.head(x)), "Copied blocks run the original blocks in training."
+
+
+def test_activation_checkpointing_hf_model():
+    config = LlamaConfig(
+        vocab_size=64,
+        hidden_size=16,
+        intermediate_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        num_key_value_heads=2,
+    )
+    data = torch.randint(0, 64, (8, 12))
+    torch.manual_seed(0)
+    trainer = _train(LlamaForCausalLM(config), data)
+    torch.manual_seed(0)
+    checkpointing_trainer = _train(LlamaForCausalLM(config), data, activation_checkpointing=True)
+    model = checkpointing_trainer.originals.models[0]
+    assert model.is_gradient_checkpointing, "Native gradient checkpointing is not enabled."
+    assert checkpointing_trainer.checkpointed_blocks == list(model.model.layers), "Wrong blocks are checkpointed."
+    assert torch.allclose(torch.tensor(checkpointing_trainer.step_losses), torch.tensor(trainer.step_losses)), \
+        "Checkpointed training does not match the original."
+    assert checkpointing_trainer.saved_activation_memory > 0, "Saved activation memory is not measured."
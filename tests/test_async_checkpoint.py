@@ -0,0 +1,72 @@
+import shutil
+from pathlib import Path
+
+import torch
+from torch import nn
+from torch.optim import AdamW
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import CheckpointHook
+
+
+temp_folder_path = Path(__file__).parents[1] / '_temp_async_checkpoints'
+
+class _TestTrainer(Trainer):
+    def __init__(self, folder_path, async_save: bool, num_epochs: int = 1, staging_path: Path = None):
+        torch.manual_seed(0)
+        model = nn.Sequential(nn.Linear(4, 8), nn.Linear(8, 1))
+        super().__init__(
+            models=[model],
+            optimizers=[AdamW(model.parameters(), lr=1e-2)],
+            data_loaders=[DataLoader(torch.randn(16, 4), batch_size=2)],
+            accelerator=Accelerator(),
+            num_epochs=num_epochs,
+        )
+        self.hooks = [CheckpointHook(self, folder_path=folder_path, interval=3, async_save=async_save, staging_folder_path=staging_path)]
+        self.losses = []
+
+
+    def compute_loss(self) -> torch.Tensor:
+        loss = self.models[0](self.ctx.batches[0]).pow(2).mean()
+        self.losses.append(loss.item())
+        return loss
+
+
+def test_async_checkpoint():
+    # set up test folder
+    shutil.rmtree(temp_folder_path, ignore_errors=True)
+    sync_path, async_path = temp_folder_path / 'sync', temp_folder_path / 'async'
+    sync_path.mkdir(parents=True)
+    async_path.mkdir(parents=True)
+    _TestTrainer(sync_path, async_save=False).run()
+    _TestTrainer(async_path, async_save=True, staging_path=temp_folder_path / 'staging').run()
+    # same files with the same states, taken at the step of saving although training went on
+    sync_dirs = sorted(d.name for d in sync_path.iterdir())
+    assert sync_dirs == sorted(d.name for d in async_path.iterdir()) == ['ckpt_step_3', 'ckpt_step_6', 'ckpt_step_8']
+    for ckpt_dir in sync_dirs:
+        sync_files = sorted(f.name for f in (sync_path / ckpt_dir).iterdir())
+        assert sync_files == sorted(f.name for f in (async_path / ckpt_dir).iterdir())
+        for file_name in ['pytorch_model.bin', 'optimizer.bin', 'random_states_0.pkl']:
+            sync_state = torch.load(sync_path / ckpt_dir / file_name, weights_only=False)
+            async_state = torch.load(async_path / ckpt_dir / file_name, weights_only=False)
+            assert str(sync_state) == str(async_state), f"{ckpt_dir}/{file_name} differs."
+        ctx_state = torch.load(async_path / ckpt_dir / 'custom_checkpoint_0.pkl', weights_only=False)
+        assert ctx_state['global_step'] + 1 == int(ckpt_dir.split('_')[-1])
+    # staged files are moved
+    assert list((temp_folder_path / 'staging' / 'process_0').iterdir()) == [], "Staged files are left behind."
+    # asynchronous checkpoints are loaded by accelerate, random states included
+    loading_trainer = _TestTrainer(async_path, async_save=True)
+    rng_state = torch.load(async_path / 'ckpt_step_8' / 'random_states_0.pkl', weights_only=False)['torch_manual_seed']
+    loading_trainer.accelerator.load_state(async_path / 'ckpt_step_8')
+    assert torch.equal(torch.get_rng_state(), rng_state), "Random states are not restored."
+    assert loading_trainer.ctx.global_step == 7, "Context is not restored."
+    # resume from the asynchronous checkpoint
+    trainer = _TestTrainer(sync_path, async_save=False, num_epochs=2)
+    trainer.run()
+    resumed_trainer = _TestTrainer(async_path, async_save=True, num_epochs=2)
+    resumed_trainer.run()
+    assert resumed_trainer.losses == trainer.losses
+    # clean up
+    shutil.rmtree(temp_folder_path)
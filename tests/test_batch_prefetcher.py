@@ -0,0 +1,99 @@
+import shutil
+from pathlib import Path
+
+import torch
+from torch import nn
+from torch.optim import AdamW
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import CheckpointHook
+
+
+temp_folder_path = Path(__file__).parents[1] / '_temp_prefetch_checkpoints'
+
+
+class _TestTrainer(Trainer):
+    def __init__(
+        self,
+        prefetch_size: int = 0,
+        gradient_accumulation_steps: int = 1,
+        ckpt_folder_path: Path = None,
+    ):
+        model = nn.Linear(1, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[AdamW(model.parameters(), lr=1e-3)],
+            data_loaders=[DataLoader(range(10), batch_size=1, shuffle=True)],
+            accelerator=Accelerator(gradient_accumulation_steps=gradient_accumulation_steps),
+            num_epochs=2,
+            prefetch_size=prefetch_size,
+        )
+        if ckpt_folder_path is not None:
+            self.hooks = [CheckpointHook(self, folder_path=ckpt_folder_path, interval=5)]
+        self.iterated_results = []
+        self.sync_flags = []
+
+
+    def training_step(self) -> torch.Tensor:
+        with self.accelerator.accumulate(*self.models):
+            self.sync_flags.append(self.accelerator.sync_gradients)
+        batch = self.accelerator.gather(
+            self.ctx.batches[0]
+        ).sort()[0]
+        self.iterated_results.append(batch)
+        return torch.tensor(0.0)
+
+
+def test_batch_prefetcher_order():
+    torch.manual_seed(0)
+    trainer = _TestTrainer(prefetch_size=0)
+    trainer.run()
+    torch.manual_seed(0)
+    prefetching_trainer = _TestTrainer(prefetch_size=3)
+    prefetching_trainer.run()
+    assert len(prefetching_trainer.iterated_results) == 20, "Not all batches are iterated."
+    assert prefetching_trainer.iterated_results == trainer.iterated_results, \
+        "Prefetched batches do not match the original."
+
+
+def test_batch_prefetcher_gradient_accumulation():
+    trainer = _TestTrainer(prefetch_size=3, gradient_accumulation_steps=3)
+    trainer.run()
+    expected_flags = [(i + 1) % 3 == 0 or i == 9 for i in range(10)] * 2
+    assert trainer.sync_flags == expected_flags, \
+        (
+            f"Gradients are not synchronized on the right steps.\n"
+            f"\tExpected {expected_flags}, got {trainer.sync_flags}."
+        )
+
+
+def test_batch_prefetcher_resume():
+    # set up test folder
+    temp_folder_path.mkdir(parents=True, exist_ok=True)
+    trainer = _TestTrainer(prefetch_size=2, ckpt_folder_path=temp_folder_path)
+    if trainer.accelerator.is_main_process:
+        shutil.rmtree(temp_folder_path)
+        temp_folder_path.mkdir(parents=True)
+    trainer.accelerator.wait_for_everyone()
+
+    trainer.run()
+    original_results = trainer.iterated_results.copy()
+
+    # remove all but the 5th
+    if trainer.accelerator.is_main_process:
+        for ckpt_dir in temp_folder_path.iterdir():
+            if ckpt_dir.name != 'ckpt_step_5':
+                shutil.rmtree(ckpt_dir)
+    trainer.accelerator.wait_for_everyone()
+
+    # test reproducibility with prefetching
+    trainer = _TestTrainer(prefetch_size=2, ckpt_folder_path=temp_folder_path)
+    trainer.run()
+    assert trainer.iterated_results == original_results[5:], "Continued batches do not match the original."
+
+    # clean up
+    if trainer.accelerator.is_main_process:
+        shutil.rmtree(temp_folder_path)
+    trainer.accelerator.wait_for_everyone()
@@ -0,0 +1,53 @@
+import torch
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from hurricore.utils import compute_causal_lm_loss
+
+
+def _build_model() -> LlamaForCausalLM:
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=128,
+        hidden_size=16,
+        intermediate_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        num_key_value_heads=2,
+    )
+    return LlamaForCausalLM(config)
+
+
+def _build_batch() -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    torch.manual_seed(0)
+    input_ids = torch.randint(0, 128, (4, 24))
+    attention_masks = torch.ones_like(input_ids)
+    attention_masks[:2, -5:] = 0
+    # prompts and paddings are ignored
+    labels = input_ids.clone()
+    labels[:, :16] = -100
+    labels[attention_masks == 0] = -100
+    return input_ids, attention_masks, labels
+
+
+def test_compute_causal_lm_loss():
+    input_ids, attention_masks, labels = _build_batch()
+    model = _build_model()
+    expected_loss = model(input_ids=input_ids, attention_mask=attention_masks, labels=labels).loss
+    expected_loss.backward()
+    expected_grads = [p.grad.clone() for p in model.parameters()]
+    for chunk_size in [None, 1, 7, 1000]:
+        for skip_ignored_labels in [False, True]:
+            model.zero_grad()
+            hidden_states = model.model(input_ids=input_ids, attention_mask=attention_masks)[0]
+            loss = compute_causal_lm_loss(
+                hidden_states, 
+                labels, 
+                model.lm_head, 
+                chunk_size=chunk_size, 
+                skip_ignored_labels=skip_ignored_labels,
+            )
+            loss.backward()
+            assert torch.allclose(loss, expected_loss), \
+                f"Loss does not match with chunk size {chunk_size} and skip_ignored_labels={skip_ignored_labels}."
+            assert all(torch.allclose(p.grad, g, atol=1e-6) for p, g in zip(model.parameters(), expected_grads)), \
+                f"Gradients do not match with chunk size {chunk_size} and skip_ignored_labels={skip_ignored_labels}."
@@ -5,7 +5,7 @@ from copy import deepcopy
 import torch
 from torch import nn
 from torch.optim import AdamW
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, Dataset
 from accelerate import Accelerator
 
 from hurricore.trainers import Trainer
@@ -15,21 +15,39 @@ from hurricore.hooks import CheckpointHook
 temp_folder_path = Path(__file__).parents[1] / '_temp_checkpoints'
 
 
+class _IndexRecordingDataset(Dataset):
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.fetched_indices = []
+    
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    
+    def __getitem__(self, idx: int) -> int:
+        self.fetched_indices.append(idx)
+        return idx
+
+
 class _TestTrainer(Trainer):
     def __init__(self):
         model = nn.Linear(1, 1)
+        self.dataset = _IndexRecordingDataset(10)
         super().__init__(
             models=[model],
             optimizers=[AdamW(model.parameters(), lr=1e-3)],
-            data_loaders=[DataLoader(range(10), batch_size=1, shuffle=True)],
+            data_loaders=[DataLoader(self.dataset, batch_size=1, shuffle=True)],
             accelerator=Accelerator(),
             num_epochs=2,
         )
         self.hooks = [CheckpointHook(self, folder_path=temp_folder_path, interval=5)]
         self.iterated_results = []
+        self.local_indices = []
     
     
     def training_step(self) -> torch.Tensor:
+        self.local_indices.extend(self.ctx.batches[0].tolist())
         batch = self.accelerator.gather(
             self.ctx.batches[0]
         ).sort()[0]
@@ -64,6 +82,7 @@ def test_checkpoint_hook_dataloader():
     assert len(trainer.iterated_results) == 5, "Continued number of batches is not correct."
     new_results = trainer.iterated_results.copy()
     assert new_results == original_results[15:], "Continued batches do not match the original."
+    assert trainer.dataset.fetched_indices == trainer.local_indices, "Skipped samples are fetched from the dataset."
 
     # remove all but the 5th
     if trainer.accelerator.is_main_process:
@@ -79,6 +98,7 @@ def test_checkpoint_hook_dataloader():
     assert len(trainer.iterated_results) == 15, "Continued number of batches is not correct."
     new_results = trainer.iterated_results.copy()
     assert new_results == original_results[5:], "Continued batches do not match the original."
+    assert trainer.dataset.fetched_indices == trainer.local_indices, "Skipped samples are fetched from the dataset."
     
     # clean up
     if trainer.accelerator.is_main_process:
@@ -86,6 +106,20 @@ def test_checkpoint_hook_dataloader():
     trainer.accelerator.wait_for_everyone()
     
 
+def _assert_same_persistent_context(original_context, new_context) -> None:
+    original_state = original_context.state_dict()
+    new_state = new_context.state_dict()
+    assert set(new_state.keys()) == {'epoch', 'batches_idx', 'global_step', 'sync_step'}, "Wrong persistent context keys."
+    for key, original_value in original_state.items():
+        new_value = new_state[key]
+        assert new_value == original_value, \
+            (
+                f"Context key {key} does not match.\n"
+                f"\tBefore: {original_value}\n"
+                f"\tAfter: {new_value}\n"
+            )
+
+
 def test_checkpoint_hook_context():
     # set up test folder
     temp_folder_path.mkdir(parents=True, exist_ok=True)
@@ -97,6 +131,9 @@ def test_checkpoint_hook_context():
         
     trainer.run()
     original_context = deepcopy(trainer.ctx)
+    # transient context is never serialized
+    saved_context = torch.load(temp_folder_path / 'ckpt_step_5' / 'custom_checkpoint_0.pkl', weights_only=False)
+    assert 'batches' not in saved_context and 'step_loss' not in saved_context, "Transient context is checkpointed."
     
     # remove all but the 5th and the 15th
     if trainer.accelerator.is_main_process:
@@ -109,16 +146,7 @@ def test_checkpoint_hook_context():
     # test reproducibility on the 2nd epoch
     trainer = _TestTrainer()
     trainer.run()
-    new_context = deepcopy(trainer.ctx)
-    for key in vars(original_context).keys():
-        new_value = getattr(new_context, key)
-        original_value = getattr(original_context, key)
-        assert new_value == original_value, \
-            (
-                f"Context key {key} does not match.\n"
-                f"\tBefore: {original_value}\n"
-                f"\tAfter: {new_value}\n"
-            )
+    _assert_same_persistent_context(original_context, trainer.ctx)
 
     # remove all but the 5th
     if trainer.accelerator.is_main_process:
@@ -131,14 +159,7 @@ def test_checkpoint_hook_context():
     # test reproducibility on the 1st epoch
     trainer = _TestTrainer()
     trainer.run()
-    new_context = deepcopy(trainer.ctx)
-    for key in vars(original_context).keys():
-        assert new_value == original_value, \
-            (
-                f"Context key {key} does not match.\n"
-                f"\tBefore: {original_value}\n"
-                f"\tAfter: {new_value}\n"
-            )
+    _assert_same_persistent_context(original_context, trainer.ctx)
     
     # clean up
     if trainer.accelerator.is_main_process:
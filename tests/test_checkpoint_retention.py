@@ -0,0 +1,83 @@
+import json
+import shutil
+from pathlib import Path
+
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import CheckpointHook
+
+
+temp_folder_path = Path(__file__).parents[1] / '_temp_retention_checkpoints'
+
+class _TestTrainer(Trainer):
+    def __init__(self, folder_path, num_epochs: int = 1, **kwargs):
+        model = nn.Linear(4, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=1e-2)],
+            data_loaders=[DataLoader(torch.randn(20, 4), batch_size=1)],
+            accelerator=Accelerator(),
+            num_epochs=num_epochs,
+        )
+        self.hooks = [CheckpointHook(self, folder_path=folder_path, interval=2, **kwargs)]
+        self.global_steps = []
+
+
+    def compute_loss(self) -> torch.Tensor:
+        self.global_steps.append(self.ctx.global_step)
+        # pretend to be evaluated with the best metric at step 8
+        self.ctx.eval_metrics = {'loss': abs(self.ctx.global_step + 1 - 8)}
+        return self.models[0](self.ctx.batches[0]).pow(2).mean()
+
+
+def _get_saved_steps(folder_path) -> list[int]:
+    return sorted(int(d.name.split('_')[-1]) for d in folder_path.iterdir())
+
+
+def test_checkpoint_retention():
+    # set up test folder
+    shutil.rmtree(temp_folder_path, ignore_errors=True)
+    all_path, last_path, best_path = temp_folder_path / 'all', temp_folder_path / 'last', temp_folder_path / 'best'
+    for path in [all_path, last_path, best_path]:
+        path.mkdir(parents=True)
+    # without policies, every checkpoint is kept
+    _TestTrainer(all_path).run()
+    assert _get_saved_steps(all_path) == list(range(2, 21, 2))
+    _TestTrainer(last_path, keep_last=2, keep_every=6).run()
+    assert _get_saved_steps(last_path) == [6, 12, 18, 20]
+    _TestTrainer(best_path, keep_best=1, async_save=True).run()
+    assert _get_saved_steps(best_path) == [8, 20]
+    # the main process records the number of processes saving a checkpoint
+    marker = json.loads((last_path / 'ckpt_step_20' / 'completed_0.json').read_text())
+    assert marker['num_processes'] == 1
+    # incomplete checkpoints are not resumed from, and deleted once older than a completed one
+    (last_path / 'ckpt_step_31').mkdir()
+    trainer = _TestTrainer(last_path, num_epochs=2, keep_last=2)
+    trainer.run()
+    assert trainer.global_steps == list(range(20, 40))
+    assert _get_saved_steps(last_path) == [38, 40]
+    # checkpoints saved before checkpoints were marked are resumed from
+    for marker_path in all_path.glob('ckpt_step_*/*.json'):
+        marker_path.unlink()
+    trainer = _TestTrainer(all_path, num_epochs=2, keep_last=1)
+    trainer.run()
+    assert trainer.global_steps == list(range(20, 40))
+    assert _get_saved_steps(all_path) == [40]
+    # an interrupted checkpoint is not resumed from, although no checkpoint is marked as completed
+    interrupted_path = temp_folder_path / 'interrupted'
+    interrupted_path.mkdir()
+    _TestTrainer(interrupted_path).run()
+    for ckpt_dir in interrupted_path.iterdir():
+        if ckpt_dir.name != 'ckpt_step_2':
+            shutil.rmtree(ckpt_dir)
+    (interrupted_path / 'ckpt_step_2' / 'completed_0.json').unlink()
+    trainer = _TestTrainer(interrupted_path)
+    trainer.run()
+    assert trainer.global_steps == list(range(20)), "Interrupted checkpoint is resumed from."
+    # clean up
+    shutil.rmtree(temp_folder_path)
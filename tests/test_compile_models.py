@@ -0,0 +1,82 @@
+import shutil
+from pathlib import Path
+
+import torch
+from torch import nn
+from torch.optim import AdamW
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import CheckpointHook
+
+
+temp_folder_path = Path(__file__).parents[1] / '_temp_compile_checkpoints'
+
+
+class _TestTrainer(Trainer):
+    def __init__(self, compile_models: bool):
+        torch.manual_seed(0)
+        model = nn.Sequential(nn.Linear(4, 8), nn.ReLU(), nn.Linear(8, 1))
+        super().__init__(
+            models=[model],
+            optimizers=[AdamW(model.parameters(), lr=1e-3)],
+            data_loaders=[DataLoader(torch.randn(10, 4), batch_size=2)],
+            accelerator=Accelerator(),
+            num_epochs=2,
+            compile_models=compile_models,
+        )
+        self.hooks = [CheckpointHook(self, folder_path=temp_folder_path, interval=5)]
+        self.step_losses = []
+
+
+    def compute_loss(self) -> torch.Tensor:
+        loss = self.models[0](self.ctx.batches[0]).mean()
+        self.step_losses.append(loss.item())
+        return loss
+
+
+def _reset_temp_folder(trainer: Trainer) -> None:
+    if trainer.accelerator.is_main_process:
+        shutil.rmtree(temp_folder_path)
+        temp_folder_path.mkdir(parents=True)
+    trainer.accelerator.wait_for_everyone()
+
+
+def test_compile_models():
+    # set up test folder
+    temp_folder_path.mkdir(parents=True, exist_ok=True)
+    trainer = _TestTrainer(compile_models=False)
+    _reset_temp_folder(trainer)
+    trainer.run()
+    original_losses = trainer.step_losses.copy()
+
+    compiled_trainer = _TestTrainer(compile_models=True)
+    _reset_temp_folder(compiled_trainer)
+    compiled_trainer.run()
+    assert all(isinstance(model, torch._dynamo.eval_frame.OptimizedModule) for model in compiled_trainer.models), \
+        "Models are not compiled."
+    assert not any(isinstance(model, torch._dynamo.eval_frame.OptimizedModule) for model in compiled_trainer.originals.models), \
+        "Original models should stay uncompiled."
+    assert compiled_trainer.compile_time is not None and compiled_trainer.compile_time > 0, "Compile time is not measured."
+    assert torch.allclose(torch.tensor(compiled_trainer.step_losses), torch.tensor(original_losses), atol=1e-5), \
+        "Compiled models do not match the original."
+    cache_path = temp_folder_path / 'ckpt_step_5' / f'compile_cache_{compiled_trainer.accelerator.process_index}.bin'
+    assert cache_path.exists(), "Compilation cache is not saved with the checkpoint."
+
+    # resume from the 5th step with the saved compilation cache
+    if compiled_trainer.accelerator.is_main_process:
+        for ckpt_dir in temp_folder_path.iterdir():
+            if ckpt_dir.name != 'ckpt_step_5':
+                shutil.rmtree(ckpt_dir)
+    compiled_trainer.accelerator.wait_for_everyone()
+    resumed_trainer = _TestTrainer(compile_models=True)
+    resumed_trainer.run()
+    assert resumed_trainer.compile_time is not None, "Compile time is not measured after resuming."
+    assert torch.allclose(torch.tensor(resumed_trainer.step_losses), torch.tensor(original_losses[5:]), atol=1e-5), \
+        "Continued losses do not match the original."
+
+    # clean up
+    if resumed_trainer.accelerator.is_main_process:
+        shutil.rmtree(temp_folder_path)
+    resumed_trainer.accelerator.wait_for_everyone()
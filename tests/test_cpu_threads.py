@@ -0,0 +1,60 @@
+import os
+
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.trainers import trainer as trainer_module
+from hurricore.utils import split_cores, PinnedWorkerInit
+
+
+class _TestTrainer(Trainer):
+    def __init__(self):
+        model = nn.Linear(4, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=1e-2)],
+            data_loaders=[DataLoader(torch.randn(8, 4), batch_size=2, num_workers=64)],
+            accelerator=Accelerator(cpu=True),
+            num_epochs=1,
+            pin_cpu_threads=True,
+        )
+
+
+    def compute_loss(self) -> torch.Tensor:
+        return self.models[0](self.ctx.batches[0]).pow(2).mean()
+
+
+def test_split_cores():
+    cores = list(range(16))
+    # 4 processes with 2 workers each
+    assert split_cores(cores, 1, 4, 2) == ([4, 5], [6, 7])
+    # at least half of the cores are kept for compute threads
+    assert split_cores(cores, 3, 2, 8) == ([8, 9, 10, 11], [12, 13, 14, 15])
+    assert split_cores(cores, 0, 1, 0) == (cores, [])
+    # more processes than cores share them
+    assert split_cores([0, 1], 3, 4, 1) == ([1], [])
+
+
+def test_pin_cpu_threads(monkeypatch):
+    # pretend to run on 8 cores, and record pinning instead of changing the threads of the test process
+    affinities, num_threads, num_interop_threads = [], [], []
+    monkeypatch.setattr(trainer_module, 'get_available_cores', lambda: list(range(8)))
+    monkeypatch.setattr(os, 'sched_setaffinity', lambda pid, cores: affinities.append(list(cores)))
+    monkeypatch.setattr(torch, 'set_num_threads', num_threads.append)
+    monkeypatch.setattr(torch, 'set_num_interop_threads', num_interop_threads.append)
+    trainer = _TestTrainer()
+    assert trainer.cpu_cores == {'compute': [0, 1, 2, 3], 'workers': [4, 5, 6, 7]}, "Cores are not split."
+    assert affinities == [[0, 1, 2, 3]], "Main process is not pinned."
+    assert num_threads == [4] and num_interop_threads == [1], "Threads are not set."
+    # workers of the prepared data loader are capped and pinned
+    data_loader = trainer.data_loaders[0]
+    assert data_loader.num_workers == 4
+    assert isinstance(data_loader.worker_init_fn, PinnedWorkerInit)
+    assert data_loader.worker_init_fn.cores == [4, 5, 6, 7]
+    data_loader.worker_init_fn(5)
+    assert affinities[-1] == [5] and num_threads[-1] == 1, "Worker is not pinned to a single core."
+    trainer.run()
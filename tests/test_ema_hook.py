@@ -0,0 +1,70 @@
+import shutil
+from pathlib import Path
+
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import Hook, EMAHook
+
+
+temp_folder_path = Path(__file__).parents[1] / '_temp_ema_checkpoints'
+
+class _ParamsRecorderHook(Hook):
+    def __init__(self, trainer: Trainer) -> None:
+        super().__init__(trainer)
+        self.params_history = []
+
+
+    def on_optimizer_step(self) -> None:
+        self.params_history.append([p.detach().clone() for p in self.trainer.originals.models[0].parameters()])
+
+
+class _TestTrainer(Trainer):
+    def __init__(self, offload_to_cpu: bool = False):
+        torch.manual_seed(0)
+        model = nn.Sequential(nn.Linear(4, 8), nn.ReLU(), nn.Linear(8, 1))
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=1e-1)],
+            data_loaders=[DataLoader(torch.randn(16, 4), batch_size=2)],
+            accelerator=Accelerator(),
+            num_epochs=2,
+        )
+        self.initial_params = [p.detach().clone() for p in model.parameters()]
+        self.ema_hook = EMAHook(self, decay=0.9, interval=2, offload_to_cpu=offload_to_cpu)
+        self.recorder_hook = _ParamsRecorderHook(self)
+        self.hooks = [self.ema_hook, self.recorder_hook]
+
+
+    def compute_loss(self) -> torch.Tensor:
+        return self.models[0](self.ctx.batches[0]).pow(2).mean()
+
+
+def test_ema_hook():
+    for offload_to_cpu in [False, True]:
+        trainer = _TestTrainer(offload_to_cpu)
+        trainer.run()
+        expected_params = trainer.initial_params
+        for params in trainer.recorder_hook.params_history[1::2]:
+            expected_params = [0.9 * e + 0.1 * p for e, p in zip(expected_params, params)]
+        assert all(torch.allclose(s.cpu(), e, atol=1e-6) for s, e in zip(trainer.ema_hook.shadow_params, expected_params)), \
+            f"Shadow weights are wrong with offload_to_cpu={offload_to_cpu}."
+        # swapping loads shadow weights temporarily
+        model = trainer.originals.models[0]
+        training_params = [p.detach().clone() for p in model.parameters()]
+        with trainer.ema_hook.swap_weights():
+            assert all(torch.allclose(p, e, atol=1e-6) for p, e in zip(model.parameters(), expected_params))
+        assert all(torch.equal(p, t) for p, t in zip(model.parameters(), training_params)), "Weights are not restored."
+        assert trainer.ema_hook._update_thread is None, "Worker thread is not stopped at the end of training."
+    # shadow weights are checkpointed with the accelerator state
+    trainer.accelerator.save_state(temp_folder_path / 'ckpt', safe_serialization=False)
+    resumed_trainer = _TestTrainer(offload_to_cpu=True)
+    resumed_trainer.accelerator.load_state(temp_folder_path / 'ckpt')
+    assert all(torch.equal(s, r) for s, r in zip(trainer.ema_hook.shadow_params, resumed_trainer.ema_hook.shadow_params)), \
+        "Shadow weights are not checkpointed."
+    # clean up
+    shutil.rmtree(temp_folder_path)
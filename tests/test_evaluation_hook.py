@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import Hook, EvaluationHook
+
+
+class _EvaluationRecorderHook(Hook):
+    def __init__(self, trainer: Trainer) -> None:
+        super().__init__(trainer)
+        self.eval_results = []
+
+
+    def on_step_end(self) -> None:
+        if hasattr(self.trainer.ctx, 'eval_metrics'):
+            self.eval_results.append(
+                (self.trainer.ctx.eval_metrics, [p.detach().clone() for p in self.trainer.originals.models[0].parameters()])
+            )
+            del self.trainer.ctx.eval_metrics
+
+
+class _TestTrainer(Trainer):
+    def __init__(self, eval_data: torch.Tensor = None):
+        torch.manual_seed(0)
+        model = nn.Linear(4, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=1e-1)],
+            data_loaders=[DataLoader(torch.randn(12, 4), batch_size=2)],
+            accelerator=Accelerator(),
+            num_epochs=2,
+        )
+        if eval_data is not None:
+            self.recorder_hook = _EvaluationRecorderHook(self)
+            self.hooks = [
+                EvaluationHook(self, data_loaders=[DataLoader(eval_data, batch_size=6)], interval=4),
+                self.recorder_hook,
+            ]
+        self.step_losses = []
+
+
+    def compute_loss(self) -> torch.Tensor:
+        # random noise checks that evaluation does not affect the random state of training
+        x = self.ctx.batches[0]
+        loss = (self.models[0](x) - torch.randn(x.size(0), 1, device=x.device)).pow(2).mean()
+        if self.models[0].training:
+            self.step_losses.append(loss.item())
+        return loss
+
+
+    def compute_eval_metrics(self) -> dict[str, torch.Tensor]:
+        x = self.ctx.batches[0]
+        return {
+            'loss': self.compute_loss(),
+            # per-sample metrics and means of batches are both averaged over samples
+            'output_mean': self.models[0](x).squeeze(1),
+        }
+
+
+def test_evaluation_hook():
+    eval_data = torch.randn(20, 4)
+    trainer = _TestTrainer()
+    trainer.run()
+    evaluating_trainer = _TestTrainer(eval_data)
+    evaluating_trainer.run()
+    assert evaluating_trainer.step_losses == trainer.step_losses, "Evaluation changes the training."
+    eval_results = evaluating_trainer.recorder_hook.eval_results
+    assert len(eval_results) == 3, "Evaluation is not triggered on the right steps."
+    for eval_metrics, params in eval_results:
+        model = nn.Linear(4, 1)
+        with torch.no_grad():
+            model.weight.copy_(params[0])
+            model.bias.copy_(params[1])
+            expected_output_mean = model(eval_data).mean().item()
+        assert set(eval_metrics.keys()) == {'loss', 'output_mean'}, "Evaluation metrics are missing."
+        assert abs(eval_metrics['output_mean'] - expected_output_mean) < 1e-6, "Evaluation metrics are wrong."
+    assert eval_results[0][0]['loss'] != eval_results[1][0]['loss'], "Evaluation does not follow the training."
+
+
+def test_evaluation_duplicated_samples(monkeypatch):
+    trainer = _TestTrainer(torch.randn(20, 4))
+    evaluation_hook = trainer.hooks[0]
+    # 10 samples sharded over 2 processes with 3 samples each per batch, the last batches are evened out
+    data_loader = SimpleNamespace(total_dataset_length=10, total_batch_size=6)
+    monkeypatch.setattr(Accelerator, 'num_processes', property(lambda _: 2))
+    for process_index, expected_num_samples in [(0, [3, 3]), (1, [3, 1])]:
+        monkeypatch.setattr(Accelerator, 'process_index', property(lambda _: process_index))
+        num_samples = [evaluation_hook._get_num_unique_samples(data_loader, idx, 3) for idx in range(2)]
+        assert num_samples == expected_num_samples, "Duplicated samples are not dropped."
+
+
+def test_evaluation_training_modes():
+    trainer = _TestTrainer(torch.randn(20, 4))
+    frozen_model = trainer.models[0]
+    frozen_model.eval()
+    trainer.ctx.batches = None
+    trainer.hooks[0]._compute_metrics()
+    assert not frozen_model.training, "Evaluation puts modules kept in eval mode into training mode."
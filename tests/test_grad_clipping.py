@@ -0,0 +1,49 @@
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+
+
+class _TestTrainer(Trainer):
+    def __init__(self, max_grad_norm: float = None):
+        torch.manual_seed(0)
+        model = nn.Sequential(nn.Linear(4, 8), nn.Linear(8, 1))
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=1e-1)],
+            data_loaders=[DataLoader(torch.randn(16, 4) * 10, batch_size=2)],
+            accelerator=Accelerator(gradient_accumulation_steps=2),
+            num_epochs=1,
+            max_grad_norm=max_grad_norm,
+        )
+        self.grad_norms = []
+        self.clipped_grad_norms = []
+
+
+    def compute_loss(self) -> torch.Tensor:
+        return (self.models[0](self.ctx.batches[0]) - 100).pow(2).mean()
+    
+    
+    def _clip_grad_norm(self) -> None:
+        params = list(self.models[0].parameters())
+        self.grad_norms.append(torch.nn.utils.get_total_norm([p.grad for p in params]))
+        super()._clip_grad_norm()
+        self.clipped_grad_norms.append(torch.nn.utils.get_total_norm([p.grad for p in params]))
+
+
+def test_grad_clipping():
+    trainer = _TestTrainer(max_grad_norm=1.0)
+    trainer.run()
+    # clipped on sync steps only
+    assert len(trainer.grad_norms) == 4, "Gradients are not clipped on every sync step."
+    assert all(norm > 1 for norm in trainer.grad_norms), "Gradients are too small for the test."
+    assert all(abs(norm - 1) < 1e-4 for norm in trainer.clipped_grad_norms), "Gradients are not clipped."
+    expected_norm = torch.stack(trainer.grad_norms).mean().item()
+    assert abs(trainer.metrics.read_epoch()['grad_norm'] - expected_norm) < 1e-3 * expected_norm, "Gradient norm is wrong."
+    # without clipping, no norm is computed
+    trainer = _TestTrainer()
+    trainer.run()
+    assert len(trainer.grad_norms) == 0 and 'grad_norm' not in trainer.metrics.read_epoch()
@@ -0,0 +1,69 @@
+import shutil
+from pathlib import Path
+
+import torch
+from torch import nn
+from torch.optim import AdamW
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import CheckpointHook, LayerFreezingHook
+
+
+temp_folder_path = Path(__file__).parents[1] / '_temp_layer_freezing_checkpoints'
+
+class _TestTrainer(Trainer):
+    def __init__(self, ckpt_folder_path=None, num_epochs: int = 1):
+        torch.manual_seed(0)
+        model = nn.Sequential(nn.Linear(4, 8), nn.Linear(8, 1))
+        super().__init__(
+            models=[model],
+            optimizers=[AdamW(model.parameters(), lr=1e-2)],
+            data_loaders=[DataLoader(torch.randn(8, 4), batch_size=2)],
+            accelerator=Accelerator(),
+            num_epochs=num_epochs,
+        )
+        # the first layer is frozen for steps [2, 6)
+        self.hooks = [LayerFreezingHook(self, schedule={2: {'0.*': False}, 6: {'0.*': True}})]
+        if ckpt_folder_path is not None:
+            self.hooks.append(CheckpointHook(self, folder_path=ckpt_folder_path, interval=4))
+        self.first_layer_weights = []
+        self.requires_grad_states = []
+
+
+    def compute_loss(self) -> torch.Tensor:
+        first_layer = self.originals.models[0][0]
+        self.first_layer_weights.append(first_layer.weight.detach().clone())
+        self.requires_grad_states.append(first_layer.weight.requires_grad)
+        return self.models[0](self.ctx.batches[0]).pow(2).mean()
+
+
+def test_layer_freezing_hook():
+    trainer = _TestTrainer(num_epochs=2)
+    trainer.run()
+    assert trainer.requires_grad_states == [True, True, False, False, False, False, True, True]
+    weights = trainer.first_layer_weights
+    assert not torch.equal(weights[1], weights[2]), "Trainable layer is not updated."
+    assert all(torch.equal(weights[2], weights[step]) for step in range(3, 7)), "Frozen layer is updated."
+    assert not torch.equal(weights[6], weights[7]), "Unfrozen layer is not updated."
+    # optimizer states are recreated after unfreezing
+    first_layer = trainer.originals.models[0][0]
+    assert first_layer.weight in trainer.optimizers[0].state
+
+
+def test_layer_freezing_hook_resume():
+    # set up test folder
+    shutil.rmtree(temp_folder_path, ignore_errors=True)
+    temp_folder_path.mkdir(parents=True)
+    trainer = _TestTrainer(ckpt_folder_path=temp_folder_path)
+    trainer.run()
+    first_layer = trainer.originals.models[0][0]
+    assert not first_layer.weight.requires_grad, "Layer is not frozen at the end of the first epoch."
+    assert first_layer.weight not in trainer.optimizers[0].state, "Optimizer state of frozen layer is kept."
+    # resume from step 4, the layer stays frozen until step 6
+    trainer = _TestTrainer(ckpt_folder_path=temp_folder_path, num_epochs=2)
+    trainer.run()
+    assert trainer.requires_grad_states == [False, False, True, True]
+    # clean up
+    shutil.rmtree(temp_folder_path)
@@ -0,0 +1,59 @@
+import torch
+from torch import nn
+from torch.optim import AdamW
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.utils import to_memory_format
+
+
+class _TestTrainer(Trainer):
+    def __init__(self, memory_format: str = None):
+        torch.manual_seed(0)
+        model = nn.Sequential(
+            nn.Conv2d(3, 8, 3, padding=1, bias=False),
+            nn.BatchNorm2d(8),
+            nn.ReLU(),
+            nn.Conv2d(8, 3, 3, padding=1),
+        )
+        data = [(torch.randn(3, 8, 8), torch.tensor(idx)) for idx in range(8)]
+        super().__init__(
+            models=[model],
+            optimizers=[AdamW(model.parameters(), lr=1e-2)],
+            data_loaders=[DataLoader(data, batch_size=2)],
+            accelerator=Accelerator(),
+            num_epochs=1,
+            memory_format=memory_format,
+        )
+        self.is_channels_last = []
+
+
+    def compute_loss(self) -> torch.Tensor:
+        images, _ = self.ctx.batches[0]
+        self.is_channels_last.append(images.is_contiguous(memory_format=torch.channels_last))
+        return (self.models[0](images) - images.flip(-1)).pow(2).mean()
+
+
+def test_memory_format():
+    trainer = _TestTrainer()
+    trainer.run()
+    assert not any(trainer.is_channels_last)
+    reference_params = [p.detach().clone() for p in trainer.originals.models[0].parameters()]
+    # same training in channels last
+    trainer = _TestTrainer(memory_format='channels_last')
+    weight = trainer.originals.models[0][0].weight
+    assert weight.is_contiguous(memory_format=torch.channels_last), "Model is not converted."
+    assert trainer.optimizers[0].param_groups[0]['params'][0] is weight, "Optimizer lost the converted parameters."
+    trainer.run()
+    assert all(trainer.is_channels_last), "Batches are not converted."
+    for reference_param, param in zip(reference_params, trainer.originals.models[0].parameters()):
+        assert torch.allclose(reference_param, param, atol=1e-5), "Training in channels last differs."
+
+
+def test_to_memory_format():
+    batches = {'images': torch.randn(2, 3, 4, 4), 'labels': torch.tensor([0, 1]), 'masks': [torch.ones(2, 4)]}
+    converted = to_memory_format(batches, torch.channels_last)
+    assert converted['images'].is_contiguous(memory_format=torch.channels_last)
+    assert torch.equal(converted['images'], batches['images'])
+    assert converted['labels'] is batches['labels'] and converted['masks'][0] is batches['masks'][0]
@@ -0,0 +1,95 @@
+import json
+import shutil
+from pathlib import Path
+
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import Hook, MetricsFileHook
+from hurricore.utils import MetricsRegistry
+
+
+temp_folder_path = Path(__file__).parents[1] / '_temp_metrics'
+
+
+class _MetricsReaderHook(Hook):
+    def __init__(self, trainer: Trainer, interval: int) -> None:
+        super().__init__(trainer)
+        self.interval = interval
+        self.results = []
+
+
+    def on_step_end(self) -> None:
+        if (self.trainer.ctx.global_step + 1) % self.interval == 0:
+            self.results.append(self.trainer.metrics.read('_MetricsReaderHook'))
+
+
+class _TestTrainer(Trainer):
+    def __init__(self):
+        model = nn.Linear(1, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=0.0)],
+            data_loaders=[DataLoader(torch.arange(12, dtype=torch.float).unsqueeze(1), batch_size=1)],
+            accelerator=Accelerator(),
+            num_epochs=2,
+        )
+        self.reader_hook = _MetricsReaderHook(self, interval=2)
+        self.hooks = [
+            MetricsFileHook(self, file_path=temp_folder_path / 'metrics.jsonl', interval=4),
+            self.reader_hook,
+        ]
+
+
+    def compute_loss(self) -> torch.Tensor:
+        x = self.ctx.batches[0]
+        self.metrics.push('x', x)
+        self.metrics.push('num_samples', x.size(0), reduction='sum')
+        return self.models[0](x).mean()
+
+
+def test_metrics_registry():
+    registry = MetricsRegistry(Accelerator())
+    assert registry.read('reader') == {} and registry.num_syncs == 0, "Empty registry should not synchronize."
+    for i in range(4):
+        registry.push('value', float(i))
+        registry.push('count', 2, reduction='sum')
+    assert registry.read('reader') == {'value': 1.5, 'count': 8.0}, "Metrics are not reduced correctly."
+    assert registry.read('another_reader') == {'value': 1.5, 'count': 8.0}, "Readers should not affect each other."
+    assert registry.num_syncs == 1, "Readers of the same values should share one collective."
+    registry.push('value', 10.0)
+    assert registry.read('reader') == {'value': 10.0}, "Reader should only get values pushed since its last read."
+    assert registry.read_epoch() == {'value': 3.2, 'count': 8.0}, "Epoch values are not accumulated correctly."
+    assert registry.num_syncs == 2, "Registry synchronizes too often."
+    registry.reset()
+    assert registry.read_epoch() == {}, "Registry is not reset."
+
+
+def test_metrics_registry_with_hooks():
+    temp_folder_path.mkdir(parents=True, exist_ok=True)
+    trainer = _TestTrainer()
+    if trainer.accelerator.is_main_process:
+        shutil.rmtree(temp_folder_path)
+        temp_folder_path.mkdir(parents=True)
+    trainer.accelerator.wait_for_everyone()
+
+    trainer.run()
+    # readers at steps 2, 4, 6, ... share the synchronization at steps 4, 8, 12, ...
+    assert trainer.metrics.num_syncs == 12, f"Expected 12 collectives, got {trainer.metrics.num_syncs}."
+    results = trainer.reader_hook.results
+    assert [r['x'] for r in results] == [2 * i + 0.5 for i in range(6)] * 2, "Reader gets wrong mean metrics."
+    assert all(r['num_samples'] == 2.0 for r in results), "Reader gets wrong sum metrics."
+    assert all('loss' in r for r in results), "Training loss is not pushed by the trainer."
+    with open(temp_folder_path / 'metrics.jsonl') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['step'] for record in records] == [4, 8, 12, 16, 20, 24], "Metrics are written on wrong steps."
+    assert [record['x'] for record in records] == [1.5, 5.5, 9.5] * 2, "Metrics are written with wrong values."
+
+    # clean up
+    if trainer.accelerator.is_main_process:
+        shutil.rmtree(temp_folder_path)
+    trainer.accelerator.wait_for_everyone()
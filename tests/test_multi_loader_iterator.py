@@ -0,0 +1,157 @@
+import shutil
+from pathlib import Path
+
+import torch
+from torch import nn
+from torch.optim import AdamW
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import Hook, CheckpointHook
+
+
+temp_folder_path = Path(__file__).parents[1] / '_temp_iteration_checkpoints'
+
+
+class _TestTrainer(Trainer):
+    def __init__(
+        self,
+        iteration_strategy: str,
+        iteration_weights: list[float] = None,
+        ckpt_folder_path: Path = None,
+    ):
+        model = nn.Linear(1, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[AdamW(model.parameters(), lr=1e-3)],
+            data_loaders=[
+                DataLoader(range(6), batch_size=1, shuffle=True),
+                DataLoader(range(100, 104), batch_size=1, shuffle=True),
+            ],
+            accelerator=Accelerator(),
+            num_epochs=2,
+            iteration_strategy=iteration_strategy,
+            iteration_weights=iteration_weights,
+        )
+        if ckpt_folder_path is not None:
+            self.hooks = [CheckpointHook(self, folder_path=ckpt_folder_path, interval=3)]
+        self.iterated_results = []
+
+
+    def training_step(self) -> torch.Tensor:
+        self.iterated_results.append(
+            tuple(None if batch is None else batch.item() for batch in self.ctx.batches)
+        )
+        return torch.tensor(0.0)
+
+
+class _OptimizerStepRecorderHook(Hook):
+    def __init__(self, trainer: Trainer) -> None:
+        super().__init__(trainer)
+        self.global_steps = []
+
+
+    def on_optimizer_step(self) -> None:
+        self.global_steps.append(self.trainer.ctx.global_step)
+
+
+class _AccumulationTrainer(Trainer):
+    def __init__(self, iteration_strategy: str, prefetch_size: int):
+        model = nn.Linear(1, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[AdamW(model.parameters(), lr=1e-3)],
+            data_loaders=[
+                DataLoader(torch.randn(10, 1), batch_size=1),
+                DataLoader(torch.randn(3, 1), batch_size=1),
+            ],
+            accelerator=Accelerator(gradient_accumulation_steps=4),
+            num_epochs=1,
+            iteration_strategy=iteration_strategy,
+            prefetch_size=prefetch_size,
+        )
+        self.recorder_hook = _OptimizerStepRecorderHook(self)
+        self.hooks = [self.recorder_hook]
+
+
+    def compute_loss(self) -> torch.Tensor:
+        return sum(self.models[0](batch).mean() for batch in self.ctx.batches if batch is not None)
+
+
+def _get_drawn_samples(results: list[tuple], idx: int) -> list[int]:
+    return [batches[idx] for batches in results if batches[idx] is not None]
+
+
+def test_iteration_strategies():
+    expected_num_steps = {
+        'zip_longest': 6,
+        'shortest': 4,
+        'cycle': 6,
+        'round_robin': 10,
+        'weighted': 10,
+    }
+    for strategy, num_steps in expected_num_steps.items():
+        trainer = _TestTrainer(strategy, iteration_weights=[3.0, 1.0])
+        trainer.run()
+        assert trainer.ctx.num_steps_per_epoch == num_steps, f"Wrong number of steps for {strategy}."
+        assert len(trainer.iterated_results) == 2 * num_steps, f"Not all steps are iterated for {strategy}."
+        if strategy in ['shortest', 'cycle']:
+            assert all(None not in batches for batches in trainer.iterated_results), \
+                f"Missing batches are handed to the trainer for {strategy}."
+        if strategy in ['round_robin', 'weighted']:
+            assert all(sum(batch is not None for batch in batches) == 1 for batches in trainer.iterated_results), \
+                f"Exactly one dataloader should be drawn per step for {strategy}."
+    # round robin should visit every sample exactly once per epoch
+    trainer = _TestTrainer('round_robin')
+    trainer.run()
+    first_epoch_results = trainer.iterated_results[:10]
+    assert sorted(_get_drawn_samples(first_epoch_results, 0)) == list(range(6))
+    assert sorted(_get_drawn_samples(first_epoch_results, 1)) == list(range(100, 104))
+
+
+def test_iteration_strategies_accumulation():
+    # optimizer steps every 4 steps of the epoch and at its end, regardless of where each dataloader ends
+    expected_global_steps = {
+        'cycle': [3, 7, 9],
+        'round_robin': [3, 7, 11, 12],
+    }
+    for strategy, global_steps in expected_global_steps.items():
+        for prefetch_size in [0, 2]:
+            trainer = _AccumulationTrainer(strategy, prefetch_size)
+            trainer.run()
+            assert trainer.recorder_hook.global_steps == global_steps, \
+                f"Wrong optimizer steps for {strategy} with prefetch size {prefetch_size}."
+
+
+def test_iteration_strategies_resume():
+    for strategy in ['zip_longest', 'shortest', 'cycle', 'round_robin', 'weighted']:
+        # set up test folder
+        temp_folder_path.mkdir(parents=True, exist_ok=True)
+        trainer = _TestTrainer(strategy, [3.0, 1.0], temp_folder_path)
+        if trainer.accelerator.is_main_process:
+            shutil.rmtree(temp_folder_path)
+            temp_folder_path.mkdir(parents=True)
+        trainer.accelerator.wait_for_everyone()
+
+        trainer.run()
+        original_results = trainer.iterated_results.copy()
+        num_steps_per_epoch = trainer.ctx.num_steps_per_epoch
+
+        # resume from a checkpoint in the middle of the 2nd epoch
+        resumed_step = 3 * (num_steps_per_epoch // 3 + 1)
+        if trainer.accelerator.is_main_process:
+            for ckpt_dir in temp_folder_path.iterdir():
+                if ckpt_dir.name != f'ckpt_step_{resumed_step}':
+                    shutil.rmtree(ckpt_dir)
+        trainer.accelerator.wait_for_everyone()
+
+        trainer = _TestTrainer(strategy, [3.0, 1.0], temp_folder_path)
+        trainer.run()
+        assert trainer.iterated_results == original_results[resumed_step:], \
+            f"Continued batches do not match the original for {strategy}."
+
+    # clean up
+    if trainer.accelerator.is_main_process:
+        shutil.rmtree(temp_folder_path)
+    trainer.accelerator.wait_for_everyone()
@@ -0,0 +1,72 @@
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer, HFLLMTrainer
+from hurricore.utils import split_batches
+
+
+class _TestTrainer(Trainer):
+    def __init__(self, max_batch_size: int = None):
+        torch.manual_seed(0)
+        model = nn.Linear(4, 1)
+        data = torch.randn(24, 4)
+        # batches of 4 samples, except a long one of 16 samples in the middle of every epoch
+        batch_sampler = [list(range(0, 4)), list(range(4, 20)), list(range(20, 24))]
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=1e-1)],
+            data_loaders=[DataLoader(data, batch_sampler=batch_sampler)],
+            accelerator=Accelerator(),
+            num_epochs=2,
+        )
+        self.max_batch_size = max_batch_size
+        self.num_forwards = 0
+
+
+    def compute_loss(self) -> torch.Tensor:
+        x = self.ctx.batches[0]
+        self.num_forwards += 1
+        # injected fault for batches that would not fit in memory
+        if self.max_batch_size is not None and x.size(0) > self.max_batch_size:
+            raise torch.cuda.OutOfMemoryError('Injected out of memory.')
+        return (self.models[0](x) - 1).pow(2).mean()
+
+
+def test_split_batches():
+    batches = ([torch.arange(5), {'x': torch.arange(10).view(5, 2), 'name': 'a'}], )
+    splits = split_batches(batches, 2)
+    assert len(splits) == 2
+    assert splits[0][0][0].tolist() == [0, 1, 2] and splits[1][0][1]['x'].tolist() == [[6, 7], [8, 9]]
+    assert splits[1][0][1]['name'] == 'a'
+
+
+def test_oom_splitting():
+    trainer = _TestTrainer()
+    trainer.run()
+    splitting_trainer = _TestTrainer(max_batch_size=5)
+    splitting_trainer.run()
+    # the long batch is split into 4 micro-batches of 4 samples, which is equivalent to the whole batch
+    for p, splitting_p in zip(trainer.models[0].parameters(), splitting_trainer.models[0].parameters()):
+        assert torch.allclose(p, splitting_p, atol=1e-6), "Split batches are not equivalent to the whole ones."
+    batch_shapes = ((16, 4), )
+    assert splitting_trainer.oom_num_splits == {batch_shapes: 4}, "Number of splits is not learned."
+    assert splitting_trainer.oom_events == [(1, batch_shapes, 2), (1, batch_shapes, 4)], "Out-of-memory events are wrong."
+    # failed attempts happen only once, the long batch of the 2nd epoch is split right away
+    assert splitting_trainer.num_forwards == trainer.num_forwards + 2 + 3 * 2, "Number of splits is not reused."
+
+
+def test_hf_llm_micro_batches():
+    input_ids = torch.ones(4, 6, dtype=torch.long)
+    labels = torch.full((4, 6), -100)
+    labels[0, 1:] = 1
+    labels[3, 3:] = 1
+    # the 2nd micro-batch has no supervised tokens
+    micro_batches_and_weights = HFLLMTrainer.get_micro_batches(None, ((input_ids, input_ids, labels), ), 3)
+    assert [micro_batches[0][0].size(0) for micro_batches, _ in micro_batches_and_weights] == [2, 1]
+    assert [weight for _, weight in micro_batches_and_weights] == [5 / 8, 3 / 8], "Weights are not proportional to tokens."
+    # without supervised tokens, no micro-batch is skipped
+    micro_batches_and_weights = HFLLMTrainer.get_micro_batches(None, ((input_ids, input_ids, torch.full((4, 6), -100)), ), 2)
+    assert [weight for _, weight in micro_batches_and_weights] == [1 / 2, 1 / 2], "Batches without supervised tokens are skipped."
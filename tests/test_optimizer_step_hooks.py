@@ -0,0 +1,77 @@
+import shutil
+from pathlib import Path
+
+import torch
+from torch import nn
+from torch.optim import AdamW
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import Hook, CheckpointHook
+
+
+temp_folder_path = Path(__file__).parents[1] / '_temp_optimizer_step_checkpoints'
+
+
+class _OptimizerStepRecorderHook(Hook):
+    def __init__(self, trainer: Trainer) -> None:
+        super().__init__(trainer)
+        self.global_steps = []
+        self.sync_steps = []
+
+
+    def on_optimizer_step(self) -> None:
+        self.global_steps.append(self.trainer.ctx.global_step)
+        self.sync_steps.append(self.trainer.ctx.sync_step)
+
+
+class _TestTrainer(Trainer):
+    def __init__(self):
+        model = nn.Linear(1, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[AdamW(model.parameters(), lr=1e-3)],
+            data_loaders=[DataLoader(torch.randn(10, 1), batch_size=1)],
+            accelerator=Accelerator(gradient_accumulation_steps=3),
+            num_epochs=2,
+        )
+        self.recorder_hook = _OptimizerStepRecorderHook(self)
+        self.hooks = [
+            self.recorder_hook,
+            CheckpointHook(self, folder_path=temp_folder_path, interval=2, interval_unit='sync_step'),
+        ]
+
+
+    def compute_loss(self) -> torch.Tensor:
+        return self.models[0](self.ctx.batches[0]).mean()
+
+
+def test_optimizer_step_hooks():
+    # set up test folder
+    temp_folder_path.mkdir(parents=True, exist_ok=True)
+    trainer = _TestTrainer()
+    if trainer.accelerator.is_main_process:
+        shutil.rmtree(temp_folder_path)
+        temp_folder_path.mkdir(parents=True)
+    trainer.accelerator.wait_for_everyone()
+
+    trainer.run()
+    # optimizer steps happen every 3 batches and at the end of each epoch
+    expected_global_steps = [2, 5, 8, 9, 12, 15, 18, 19]
+    assert trainer.recorder_hook.global_steps == expected_global_steps, \
+        (
+            f"Optimizer step events are triggered on wrong steps.\n"
+            f"\tExpected {expected_global_steps}, got {trainer.recorder_hook.global_steps}."
+        )
+    assert trainer.recorder_hook.sync_steps == list(range(1, 9)), "Optimizer steps are not counted correctly."
+    # checkpoints are saved every 2 optimizer steps
+    ckpt_names = sorted(d.name for d in temp_folder_path.iterdir())
+    expected_ckpt_names = sorted(f'ckpt_step_{expected_global_steps[i] + 1}' for i in [1, 3, 5, 7])
+    assert ckpt_names == expected_ckpt_names, \
+        f"Checkpoints are saved on wrong steps.\n\tExpected {expected_ckpt_names}, got {ckpt_names}."
+
+    # clean up
+    if trainer.accelerator.is_main_process:
+        shutil.rmtree(temp_folder_path)
+    trainer.accelerator.wait_for_everyone()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import signal
+from pathlib import Path
+
+import pytest
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import Hook, CheckpointHook
+
+
+temp_folder_path = Path(__file__).parents[1] / '_temp_preemption_checkpoints'
+
+class _SignalHook(Hook):
+    def __init__(self, trainer: Trainer, step: int) -> None:
+        super().__init__(trainer)
+        self.step = step
+
+
+    def on_step_end(self) -> None:
+        if self.trainer.ctx.global_step == self.step:
+            os.kill(os.getpid(), signal.SIGUSR1)
+
+
+class _TestTrainer(Trainer):
+    def __init__(self, folder_path, signal_step: int = None):
+        torch.manual_seed(0)
+        model = nn.Linear(2, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=1e-1)],
+            data_loaders=[DataLoader(torch.randn(12, 2), batch_size=2)],
+            accelerator=Accelerator(gradient_accumulation_steps=2),
+            num_epochs=2,
+            preemption_signals=[signal.SIGUSR1],
+        )
+        self.hooks = [CheckpointHook(self, folder_path=folder_path, interval=100)]
+        if signal_step is not None:
+            self.hooks.insert(0, _SignalHook(self, signal_step))
+        self.step_losses = []
+
+
+    def compute_loss(self) -> torch.Tensor:
+        loss = self.models[0](self.ctx.batches[0]).pow(2).mean()
+        self.step_losses.append(loss.item())
+        return loss
+
+
+def test_preemption():
+    # set up test folder
+    shutil.rmtree(temp_folder_path, ignore_errors=True)
+    (temp_folder_path / 'reference').mkdir(parents=True)
+    (temp_folder_path / 'preempted').mkdir(parents=True)
+    reference_trainer = _TestTrainer(temp_folder_path / 'reference')
+    reference_trainer.run()
+    # signal on the first micro-step of an accumulation, the optimizer step is finished before exiting
+    trainer = _TestTrainer(temp_folder_path / 'preempted', signal_step=8)
+    with pytest.raises(SystemExit) as exit_info:
+        trainer.run()
+    assert exit_info.value.code == 75, "Exit code is wrong."
+    assert [d.name for d in (temp_folder_path / 'preempted').iterdir()] == ['ckpt_step_10'], "Checkpoint is not saved on preemption."
+    assert signal.getsignal(signal.SIGUSR1) is signal.SIG_DFL, "Signal handler is not restored."
+    resumed_trainer = _TestTrainer(temp_folder_path / 'preempted')
+    resumed_trainer.run()
+    assert trainer.step_losses + resumed_trainer.step_losses == reference_trainer.step_losses, \
+        "Resumed training does not match the uninterrupted one."
+    # clean up
+    shutil.rmtree(temp_folder_path)
@@ -0,0 +1,95 @@
+import time
+import logging
+
+import pytest
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import LoggerHook
+from hurricore.utils import ResourceMonitor
+from hurricore.utils import resource_monitor
+
+
+class _RecordingHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records = []
+
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+class _TestTrainer(Trainer):
+    def __init__(self, logger: logging.Logger = None):
+        model = nn.Linear(1, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=1e-3)],
+            data_loaders=[DataLoader(torch.randn(8, 1), batch_size=2, num_workers=1)],
+            accelerator=Accelerator(),
+            num_epochs=2,
+            resource_monitor_interval=0.01,
+        )
+        if logger is not None:
+            self.hooks = [LoggerHook(self, logger=logger, interval=2)]
+
+
+    def compute_loss(self) -> torch.Tensor:
+        # slow enough for the monitor to take samples
+        time.sleep(0.02)
+        return self.models[0](self.ctx.batches[0]).mean()
+
+
+def test_resource_monitor(monkeypatch):
+    data_loader = DataLoader(torch.randn(8, 1), batch_size=2, num_workers=1)
+    iterator = iter(data_loader)
+    next(iterator)
+    monitor = ResourceMonitor(device='cpu')
+    monitor.sample()
+    snapshot = monitor.sample()
+    assert snapshot['host_rss'] > 0 and snapshot['worker_rss'] > 0, "Memory is not sampled."
+    assert snapshot['cpu_percent'] >= 0, "CPU utilization is not sampled."
+    # the /proc fallback matches psutil
+    monkeypatch.setattr(resource_monitor, 'psutil', None)
+    fallback_snapshot = monitor.sample()
+    assert abs(fallback_snapshot['host_rss'] - snapshot['host_rss']) < 0.1 * snapshot['host_rss']
+    assert abs(fallback_snapshot['worker_rss'] - snapshot['worker_rss']) < 0.1 * snapshot['worker_rss']
+    del iterator
+    # failing samplers are dropped, custom samplers are kept
+    def failing_sampler():
+        raise RuntimeError
+    monitor.add_sampler(failing_sampler)
+    monitor.add_sampler(lambda: {'custom': 1.0})
+    snapshot = monitor.sample()
+    assert failing_sampler not in monitor.samplers and snapshot['custom'] == 1.0
+
+
+def test_logger_hook_on_cpu():
+    logger = logging.getLogger('test_resource_monitor')
+    logger.setLevel(logging.INFO)
+    handler = _RecordingHandler()
+    logger.addHandler(handler)
+    trainer = _TestTrainer(logger)
+    trainer.run()
+    logger.removeHandler(handler)
+    assert all(record.levelno < logging.ERROR for record in handler.records), "Training failed."
+    state_messages = [record.getMessage() for record in handler.records if record.getMessage().startswith('Epoch: ')]
+    assert len(state_messages) == 4, "States are not logged."
+    assert 'CPU usage' in state_messages[-1] and 'Workers RSS' in state_messages[-1], "Resources are not logged."
+    assert trainer.resource_monitor._thread is None, "Resource monitor is not stopped."
+
+
+def test_resource_monitor_stopped_on_error():
+    # without `LoggerHook`, which logs errors instead of raising them
+    trainer = _TestTrainer()
+    def failing_compute_loss():
+        raise RuntimeError('Training failed.')
+    trainer.compute_loss = failing_compute_loss
+    with pytest.raises(RuntimeError):
+        trainer.run()
+    assert trainer.resource_monitor._thread is None, "Resource monitor is not stopped after an error."
@@ -0,0 +1,91 @@
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from hurricore.trainers import Trainer
+from hurricore.utils import compute_per_sample_causal_lm_loss
+
+
+class _TestTrainer(Trainer):
+    def __init__(self, strategy: str):
+        torch.manual_seed(0)
+        model = nn.Linear(4, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=1e-2)],
+            data_loaders=[DataLoader(torch.randn(32, 4), batch_size=8)],
+            accelerator=Accelerator(),
+            num_epochs=1,
+            selective_backprop_ratio=0.25,
+            selective_backprop_strategy=strategy,
+        )
+        self.candidate_losses = []
+        self.trained_losses = []
+        self.training_modes = []
+
+
+    def compute_per_sample_loss(self) -> torch.Tensor:
+        losses = self.models[0](self.ctx.batches[0]).squeeze(1).pow(2)
+        self.candidate_losses.append(losses.detach().clone())
+        return losses
+
+
+    def compute_loss(self) -> torch.Tensor:
+        losses = self.models[0](self.ctx.batches[0]).squeeze(1).pow(2)
+        self.trained_losses.append(losses.detach().clone())
+        self.training_modes.append(self.models[0].training)
+        return losses.mean()
+
+
+def test_selective_backprop():
+    for strategy in ['top_k', 'sample']:
+        trainer = _TestTrainer(strategy)
+        trainer.run()
+        assert len(trainer.trained_losses) == 4 and all(len(losses) == 2 for losses in trainer.trained_losses), \
+            f"Wrong number of selected samples with {strategy}."
+        if strategy == 'top_k':
+            for candidate_losses, trained_losses in zip(trainer.candidate_losses, trainer.trained_losses):
+                expected_losses = candidate_losses.topk(2).values
+                assert torch.allclose(trained_losses.sort().values, expected_losses.sort().values), \
+                    "Samples with the highest losses are not selected."
+        assert all(trainer.training_modes), "Training mode is not restored after selection."
+        metrics = trainer.metrics.read_epoch()
+        assert abs(metrics['selection_ratio'] - 0.25) < 1e-6, "Selection ratio is not recorded."
+        assert metrics['selected_loss'] >= metrics['candidate_loss'], "Selected samples are easier than the candidates."
+
+
+def test_compute_per_sample_causal_lm_loss():
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=128,
+        hidden_size=16,
+        intermediate_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        num_key_value_heads=2,
+    )
+    model = LlamaForCausalLM(config)
+    input_ids = torch.randint(0, 128, (3, 12))
+    labels = input_ids.clone()
+    labels[:, :6] = -100
+    labels[2] = -100
+    with torch.no_grad():
+        expected_losses = [
+            model(input_ids=input_ids[i:i + 1], labels=labels[i:i + 1]).loss if i < 2 else torch.tensor(0.0)
+            for i in range(3)
+        ]
+        hidden_states = model.model(input_ids=input_ids)[0]
+        for chunk_size in [None, 1, 4]:
+            for skip_ignored_labels in [False, True]:
+                losses = compute_per_sample_causal_lm_loss(
+                    hidden_states, 
+                    labels, 
+                    model.lm_head, 
+                    chunk_size=chunk_size, 
+                    skip_ignored_labels=skip_ignored_labels,
+                )
+                assert torch.allclose(losses, torch.stack(expected_losses), atol=1e-5), \
+                    f"Per-sample losses do not match with chunk size {chunk_size} and skip_ignored_labels={skip_ignored_labels}."
@@ -0,0 +1,57 @@
+import torch
+from torch import nn
+from torch.optim import AdamW
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import Hook
+
+
+class _SlowHook(Hook):
+    def on_step_end(self) -> None:
+        # busy wait so that the hook dominates the step time
+        x = torch.ones(256, 256)
+        for _ in range(20):
+            x = x @ x / 256
+
+
+class _TestTrainer(Trainer):
+    def __init__(self):
+        model = nn.Linear(1, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[AdamW(model.parameters(), lr=1e-3)],
+            data_loaders=[DataLoader(torch.randn(8, 1), batch_size=2)],
+            accelerator=Accelerator(),
+            num_epochs=2,
+        )
+        self.hooks = [_SlowHook(self)]
+
+
+    def compute_loss(self) -> torch.Tensor:
+        return self.models[0](self.ctx.batches[0]).mean()
+
+
+def test_step_timer():
+    trainer = _TestTrainer()
+    trainer.run()
+    step_timings = trainer.ctx.step_timings
+    expected_names = [
+        'data_wait',
+        'compute_loss',
+        'backward',
+        'optimizer_step',
+        'training_step',
+        '_SlowHook.on_step_start',
+        '_SlowHook.on_step_end',
+    ]
+    for name in expected_names:
+        assert name in step_timings, f"Timing of {name} is not recorded."
+        assert step_timings[name] >= 0, f"Timing of {name} is invalid."
+    assert step_timings['_SlowHook.on_step_end'] > step_timings['_SlowHook.on_step_start'], \
+        "Hook timings are not attributed to the right callback."
+    assert trainer.timer.stats['training_step']['count'] == 8, "Not all steps are timed."
+    # events that do not run every step are not reported as step timings
+    assert not any(name.endswith(('on_training_start', 'on_epoch_start', 'on_epoch_end')) for name in step_timings), \
+        "One-off hook events are reported as step timings."
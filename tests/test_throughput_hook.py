@@ -0,0 +1,76 @@
+import torch
+from torch import nn
+from torch.optim import SGD
+from torch.utils.data import DataLoader
+from accelerate import Accelerator
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from hurricore.trainers import Trainer
+from hurricore.hooks import ThroughputHook
+from hurricore.utils import estimate_flops_per_token, get_num_matmul_params
+
+
+class _TestTrainer(Trainer):
+    def __init__(self):
+        model = nn.Linear(1, 1)
+        super().__init__(
+            models=[model],
+            optimizers=[SGD(model.parameters(), lr=0.0)],
+            data_loaders=[DataLoader(torch.randn(8, 1), batch_size=2)],
+            accelerator=Accelerator(),
+            num_epochs=2,
+        )
+        self.throughput_hook = ThroughputHook(self, interval=2, peak_flops=1e6)
+        self.hooks = [self.throughput_hook]
+
+
+    def compute_loss(self) -> torch.Tensor:
+        self.metrics.push('num_samples', 2, reduction='sum')
+        self.metrics.push('num_tokens', 20, reduction='sum')
+        self.metrics.push('model_flops', 1000, reduction='sum')
+        return self.models[0](self.ctx.batches[0]).mean()
+
+
+def test_throughput_hook():
+    trainer = _TestTrainer()
+    trainer.run()
+    throughputs = trainer.throughput_hook.throughputs
+    expected_names = [
+        'global samples/s', 
+        'per-rank samples/s', 
+        'global tokens/s', 
+        'per-rank tokens/s', 
+        'per-rank TFLOP/s', 
+        'MFU',
+    ]
+    assert list(throughputs.keys()) == expected_names, "Throughputs are missing."
+    assert abs(throughputs['global tokens/s'] / throughputs['global samples/s'] - 10) < 1e-6, "Throughputs are inconsistent."
+    assert abs(throughputs['MFU'] - throughputs['per-rank TFLOP/s'] * 1e12 / 1e6) < 1e-6, "MFU is wrong."
+
+
+def test_estimate_flops_per_token():
+    config = LlamaConfig(
+        vocab_size=100,
+        hidden_size=16,
+        intermediate_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        num_key_value_heads=2,
+    )
+    model = LlamaForCausalLM(config)
+    num_params = sum(p.numel() for p in model.parameters())
+    assert get_num_matmul_params(model) == num_params - 100 * 16, "Input embeddings should be excluded."
+    config.tie_word_embeddings = True
+    tied_model = LlamaForCausalLM(config)
+    tied_num_params = sum(p.numel() for p in tied_model.parameters())
+    assert get_num_matmul_params(tied_model) == tied_num_params, "Tied embeddings should be included."
+    assert estimate_flops_per_token(1000, 2, 16, 8) == 6 * 1000 + 12 * 2 * 16 * 8
+    # frozen parameters only need forward and input gradient matmuls
+    for param in tied_model.model.layers.parameters():
+        param.requires_grad_(False)
+    num_frozen_params = sum(p.numel() for p in tied_model.model.layers.parameters())
+    assert get_num_matmul_params(tied_model, requires_grad=False) == num_frozen_params, "Frozen parameters are miscounted."
+    assert get_num_matmul_params(tied_model, requires_grad=True) == tied_num_params - num_frozen_params, "Trainable parameters are miscounted."
+    assert estimate_flops_per_token(1000, 2, 16, 8, num_frozen_matmul_params=400) == 6 * 600 + 4 * 400 + 12 * 2 * 16 * 8
+    # forward passes, e.g. of candidates of selective backprop, are a third of a training step
+    assert estimate_flops_per_token(1000, 2, 16, 8, num_frozen_matmul_params=400, include_backward=False) == (6 * 1000 + 12 * 2 * 16 * 8) // 3